@@ -3,53 +3,108 @@ import os
 # Enable asyncio debug logging
 os.environ['PYTHONASYNCIODEBUG'] = '1'
 
-import ast
+import collections
+import concurrent.futures
 import functools
+import sys
 import pkgutil
 import importlib
+import importlib.util
 import asyncio
 import threading
 import atexit
 
 import gta_native
 
-from gta import ui, exceptions, enums
+from gta import ui, exceptions, enums, cache, profiler, tasks, executor, reloader, shutdown
 from gta.exceptions import *
 from gta.enums import *
+from gta.timer import TickWheel
+from gta.dispatcher import KeyDispatcher
+from gta.poller import RequirementPoller
+from gta.metadata import MetadataCache
+from gta.scheduler import FrameScheduler
+from gta.reloader import ScriptWatcher
+from gta.registry import ScriptRegistry
+from gta.supervisor import ScriptSupervisor
 
 __author__ = 'Lennart Grahl <lennart.grahl@gmail.com>'
 __status__ = 'Development'
 __version__ = '0.10.16'
-__all__ = exceptions.__all__ + enums.__all__
+__all__ = ('get_registry',) + exceptions.__all__ + enums.__all__
+
+# The maximum amount of scripts that will be imported concurrently
+_import_workers = 4
+# The amount of seconds scripts have to stop after they have been cancelled
+_stop_timeout = 1.0
+
+# Note: Scripts that are loaded at runtime must not install dependencies or write
+#       the metadata cache concurrently
+_load_lock = threading.Lock()
+
+
+def get_registry():
+    """
+    Return the :class:`gta.registry.ScriptRegistry` that can be used to
+    start, stop and restart scripts at runtime, e.g. to shed load.
+
+    The coroutines of the registry must be run in the event loop. Use
+    :meth:`gta.registry.ScriptRegistry.threadsafe` when calling from
+    another thread::
+
+        registry = gta.get_registry()
+        future = registry.threadsafe(registry.stop('wanted'))
+        stopped = future.result(timeout=2.0)
+
+    Raise :class:`ScriptError` if the scripts have not been started.
+    """
+    try:
+        registry = _registry
+    except NameError:
+        registry = None
+    if registry is None:
+        raise ScriptError('Scripts have not been started')
+    return registry
 
 
 def _reset_globals():
     """
     Set global attributes.
     """
-    global _utils, _thread, _loop, _tasks, _names
+    global _utils, _thread, _loop, _registry, _supervisor, _script_watcher, _stopping
+    global _tick_count, _tick_handled, _tick_scheduled
     _utils = None
     _thread = None
     _loop = None
-    _tasks = []
-    _names = []
+    _registry = None
+    _supervisor = None
+    _script_watcher = None
+    _stopping = None
+    _tick_count = 0
+    _tick_handled = 0
+    _tick_scheduled = False
 
 
-def _reset_futures(loop):
+def _reset_events(loop):
     """
-    Set global futures.
+    Set the global tick wheel, key dispatcher, requirement poller and
+    frame scheduler.
 
     Arguments:
         - `loop`: The loop the futures will be assigned to.
     """
-    global _tick_future, _key_future
+    global _tick_wheel, _key_dispatcher, _requirement_poller, _frame_scheduler
     try:
-        _tick_future.cancel()
-        _key_future.cancel()
+        _requirement_poller.clear()
+        _tick_wheel.clear()
+        _key_dispatcher.clear()
     except NameError:
         pass
-    _tick_future = asyncio.Future(loop=loop)
-    _key_future = asyncio.Future(loop=loop)
+    cache.clear()
+    _tick_wheel = TickWheel(loop, current=_tick_handled)
+    _key_dispatcher = KeyDispatcher(loop)
+    _requirement_poller = RequirementPoller(loop, _tick_wheel, _utils.get_logger('gta.wait'))
+    _frame_scheduler = FrameScheduler(loop)
 
 
 def _reset_viewport():
@@ -81,7 +136,7 @@ def _start(console):
     Arguments:
         - `console`: Use console logging instead of file logging.
     """
-    global _utils, _loop, _names, _tasks
+    global _utils, _loop, _registry, _supervisor
 
     # Import utils
     # Note: This needs to be done here because the logging module binds
@@ -96,10 +151,15 @@ def _start(console):
 
     # Create event loop
     _loop = asyncio.new_event_loop()
+    _loop.set_task_factory(tasks.task_factory)
     asyncio.set_event_loop(_loop)
+    tasks.reset_stats()
+    load = functools.partial(_load_script, 'scripts')
+    _registry = ScriptRegistry(_loop, load, done_callback=_script_done)
+    _supervisor = ScriptSupervisor(_loop, _registry)
 
-    # Reset futures and viewport
-    _reset_futures(_loop)
+    # Reset events and viewport
+    _reset_events(_loop)
     _reset_viewport()
 
     # Print some debug information
@@ -107,28 +167,31 @@ def _start(console):
     logger.info('Version: {}', __version__)
     logger.info('Natives Date: {}', gta_native.__version__)
 
+    # Profile native calls if requested
+    profiler.enable_from_environment()
+    if profiler.is_enabled():
+        logger.info('Profiling native calls')
+
     # Start scripts
-    _names, _tasks = _start_scripts(_loop)
-    if len(_tasks) > 0:
-        try:
-            _loop.run_until_complete(asyncio.wait(_tasks))
-        except RuntimeError:
-            bad_scripts = [(name, task) for name, task in zip(_names, _tasks)
-                           if not task.done()]
-
-            # Mark bad behaving scripts as done
-            for name, task in bad_scripts:
-                # Note: We log the task so scripters can see in which line their script
-                # was running when cancelled
-                logger.error('Script "{}" did not stop in time, Task: {}', name, task)
-                # Note: At this point, the task is marked as done but callbacks will
-                # not be called anymore. We are just doing this to comfort asyncio
-                # to not throw any exceptions because the task wasn't marked done
-                task.set_result(BadBehavingScriptError())
-
-            # Report bad behaving scripts
-            scripts = ', '.join(('"{}"'.format(name) for name, task in bad_scripts))
-            logger.warning('Enforced stopping loop, caused by script(s): {}', scripts)
+    try:
+        _loop.run_until_complete(_run_scripts(_loop))
+    except RuntimeError:
+        bad_scripts = [(entry.name, entry.task) for entry in _registry.list()
+                       if entry.running]
+
+        # Mark bad behaving scripts as done
+        for name, task in bad_scripts:
+            # Note: We log the task so scripters can see in which line their script
+            # was running when cancelled
+            logger.error('Script "{}" did not stop in time, Task: {}', name, task)
+            # Note: At this point, the task is marked as done but callbacks will
+            # not be called anymore. We are just doing this to comfort asyncio
+            # to not throw any exceptions because the task wasn't marked done
+            task.set_result(BadBehavingScriptError())
+
+        # Report bad behaving scripts
+        scripts = ', '.join(('"{}"'.format(name) for name, task in bad_scripts))
+        logger.warning('Enforced stopping loop, caused by script(s): {}', scripts)
 
     logger.info('Complete')
 
@@ -136,14 +199,37 @@ def _start(console):
 def _tick():
     """
     Handle a game tick event.
+
+    The game thread only increments the tick counter. The event loop
+    will be woken up at most once until it has processed the pending
+    ticks.
     """
+    global _tick_count, _tick_scheduled
     if _loop is not None and not _loop.is_closed():
-        def __tick():
-            global _tick_future
-            _tick_future.set_result(None)
-            _tick_future = asyncio.Future(loop=_loop)
-            #ui.draw()
-        _loop.call_soon_threadsafe(__tick)
+        _tick_count += 1
+        if not _tick_scheduled:
+            _tick_scheduled = True
+            _loop.call_soon_threadsafe(_process_ticks)
+
+
+def _process_ticks():
+    """
+    Process all game ticks that occurred since the last call at once.
+
+    .. warning:: Must be called from within the event loop.
+    """
+    global _tick_scheduled, _tick_handled
+    # Note: The flag needs to be cleared before the counter is read, so a tick
+    #       that happens in the meantime will schedule another call
+    _tick_scheduled = False
+    if _tick_count == _tick_handled:
+        return
+
+    # Start a new frame budget and resolve all tick waiters that expired
+    _tick_handled = _tick_count
+    _frame_scheduler.tick()
+    _tick_wheel.advance(_tick_handled)
+    #ui.draw()
 
 
 def _key(code, down, **modifiers):
@@ -160,12 +246,7 @@ def _key(code, down, **modifiers):
         code = Key(code)
         # logger = _utils.get_logger()
         # logger.debug("Key '{}', down: {}, modifiers: {}", code, down, modifiers)
-
-        def __key():
-            global _key_future
-            _key_future.set_result((code, down, modifiers))
-            _key_future = asyncio.Future(loop=_loop)
-        _loop.call_soon_threadsafe(__key)
+        _loop.call_soon_threadsafe(_key_dispatcher.dispatch, code, down, modifiers)
 
 
 def _exit():
@@ -178,8 +259,9 @@ def _exit():
 
         # Schedule stop routine
         def __stop(loop):
+            global _stopping
             logger.debug('Stopping scripts')
-            loop.create_task(_stop(loop))
+            _stopping = loop.create_task(_stop(loop))
         _loop.call_soon_threadsafe(__stop, _loop)
 
 
@@ -196,64 +278,255 @@ def _join():
     # Wait until the thread of the event loop terminates
     if _thread is not None:
         logger.debug('Joining')
-        _thread.join(timeout=1.1)
+        # Note: Cleanup hooks are run while the scripts are stopping, the deadline
+        #       includes hooks that have already been started
+        _thread.join(timeout=max(_stop_timeout, shutdown.get_deadline()) + 0.1)
         if _thread.is_alive():
             logger.error('Joining timed out, terminating ungracefully')
 
     # Reset globals and exit
+    utils = _utils
     _reset_globals()
     logger.info('Exiting')
 
+    # Write pending log records
+    utils.stop_logging()
+
 
 @asyncio.coroutine
-def _stop(loop, seconds=1.0):
+def _stop(loop, seconds=_stop_timeout):
     """
     Stop scripts, wait for tasks to clean up or until a timeout occurs
     and stop the loop.
 
+    The cleanup hooks of all scripts are run concurrently while the
+    scripts are stopping. Each hook is limited by its own deadline.
+
     Arguments:
         - `loop`: The :class:`asyncio.BaseEventLoop` that is being used.
-        - `seconds`: The maximum amount of seconds to wait.
+        - `seconds`: The maximum amount of seconds to wait for the
+          scripts to stop.
     """
     logger = _utils.get_logger()
+    start = loop.time()
 
     # Stop scripts
-    _stop_scripts(_tasks)
+    # Note: Steps must not be deferred while the scripts are shutting down
+    _frame_scheduler.disable()
+    _supervisor.stop()
+    if _script_watcher is not None:
+        _script_watcher.stop()
+    entries = [entry for entry in _registry.list() if entry.task is not None]
+    _stop_scripts([entry.task for entry in entries])
+
+    # Remember how long each script took to stop
+    stopped = {}
+
+    def _stopped(name, _):
+        stopped[name] = loop.time() - start
+
+    for entry in entries:
+        entry.task.add_done_callback(functools.partial(_stopped, entry.name))
 
-    # Wait for scripts to clean up
+    # Wait for scripts and their cleanup hooks
     logger.debug('Waiting for scripts to stop')
-    yield from asyncio.wait(_tasks, timeout=seconds)
+    cleanup = loop.create_task(shutdown.run())
+    if len(entries) > 0:
+        yield from asyncio.wait([entry.task for entry in entries], timeout=seconds)
+    cleaned_up = yield from cleanup
+
+    # Report teardown durations
+    for entry in entries:
+        if entry.name in stopped:
+            duration = max(stopped[entry.name], cleaned_up.get(entry.name, 0.0))
+            logger.info('Script "{}" teardown took {:.1f} ms', entry.name, duration * 1000)
+
+    # Stop worker pools
+    logger.debug('Shutting down worker pools')
+    executor.shutdown()
+
+    # Report how many native calls have been saved by caching
+    for name, (hits, misses) in sorted(cache.get_stats().items()):
+        logger.debug('Tick cache "{}": {} hits, {} misses', name, hits, misses)
 
-    # Stop loop
-    logger.debug('Stopping loop')
-    loop.stop()
+    # Report time spent in each script
+    for name, stats in sorted(tasks.get_stats().items()):
+        logger.info('Script "{}" stats: {}', name, stats)
 
+    for name, stats in sorted(_supervisor.get_stats().items()):
+        logger.info('Script "{}" crash stats: {}', name, stats)
+    if _script_watcher is not None:
+        logger.info('Hot reload stats: {}', _script_watcher.stats)
 
+    logger.info('Steps deferred by the frame budget: {}', _frame_scheduler.deferred)
+    for priority, stats in sorted(_frame_scheduler.get_stats().items()):
+        logger.info('Priority class "{}" stats: {}', priority.name, stats)
+
+    # Report native calls
+    profiler.dump(logger)
+
+    logger.info('Shutdown took {:.1f} ms', (loop.time() - start) * 1000)
+
+    # Stop loop if scripts did not stop in time
+    # Note: Otherwise, the loop stops once the scripts and this routine are done
+    if any((entry.running for entry in entries)):
+        logger.debug('Stopping loop')
+        loop.stop()
+
+
+@asyncio.coroutine
 def _start_scripts(loop):
     """
     Run the main function of all scripts from the `scripts` package.
 
+    The dependencies of all scripts are installed in a single pass
+    first. Afterwards, the scripts are imported concurrently and each
+    script will be started as soon as its import has finished.
+
+    Started scripts will be added to the global script registry.
+
     Arguments:
         - `loop`: The :class:`asyncio.BaseEventLoop` that is going to be used.
-
-    Return a tuple containing a list of imported script names and
-    another list that maps the script names to:class:`asyncio.Task`
-    instances.
     """
     logger = _utils.get_logger()
     logger.info('Starting scripts')
 
-    # Start each script as a coroutine
-    names = []
-    tasks = []
-    for name, script in _import_scripts():
-        logger.info('Starting script "{}"', name)
-        task = loop.create_task(script())
-        task.add_done_callback(functools.partial(_script_done, name=name))
-        names.append(name)
-        tasks.append(task)
+    # Import parent package
+    parent_package = 'scripts'
+    importlib.import_module(parent_package, __name__)
+
+    # Get metadata of all scripts and install their dependencies
+    scripts = _discover_scripts(parent_package)
+    failed = _install_dependencies(scripts)
+
+    @asyncio.coroutine
+    def _import_and_start(name, metadata):
+        try:
+            module = yield from loop.run_in_executor(
+                pool, _with_event_loop, loop, _import_script, parent_package, name)
+            # Note: Scripts may be stopped while they are still being imported
+            if _stopping is not None:
+                logger.info('Not starting script "{}" because scripts are stopping', name)
+                return
+            _registry.add(name, module, metadata)
+        except ScriptError as exc:
+            logger.exception(exc)
+        except Exception:
+            # Note: Nobody retrieves the exception of this task, so it must not escape
+            logger.exception(ImportScriptError(name))
+
+    # Import scripts concurrently and start each script once imported
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=_import_workers)
+    try:
+        loaders = [loop.create_task(_import_and_start(name, metadata))
+                   for name, metadata in scripts if name not in failed]
+        if len(loaders) > 0:
+            yield from asyncio.wait(loaders)
+    finally:
+        pool.shutdown(wait=False)
     logger.info('Scripts started')
-    return names, tasks
+
+    # Watch for changed scripts if requested
+    interval = reloader.get_interval()
+    if interval is not None and _stopping is None:
+        global _script_watcher
+        logger.info('Watching scripts for changes every {} second(s)', interval)
+        reload = functools.partial(_reload_script, parent_package)
+        path = os.path.join(_utils.get_directory(), parent_package)
+        _script_watcher = ScriptWatcher(loop, path, reload, interval=interval)
+        _script_watcher.start()
+
+
+@asyncio.coroutine
+def _run_scripts(loop):
+    """
+    Start all scripts and wait until they are done.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being used.
+    """
+    yield from _start_scripts(loop)
+
+    # Note: Tasks are replaced when scripts are reloaded while waiting
+    while True:
+        pending = [task for task in _registry.tasks() if not task.done()]
+        pending += _supervisor.pending()
+        if _stopping is not None and not _stopping.done():
+            pending.append(_stopping)
+        if _script_watcher is not None:
+            pending += _script_watcher.pending()
+        if len(pending) == 0:
+            break
+        yield from asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+
+@asyncio.coroutine
+def _load_script(parent_package, name, reload=False):
+    """
+    Get the metadata of a script, install its dependencies and import
+    it in a worker thread, so other scripts keep running.
+
+    Arguments:
+        - `parent_package`: The name of the package containing the
+          script.
+        - `name`: The name of the script.
+        - `reload`: Reload the script if it has been imported before.
+
+    Return a tuple containing the module and the metadata of the
+    script.
+    """
+    return (yield from _loop.run_in_executor(
+        None, _with_event_loop, _loop, _load_script_blocking, parent_package, name, reload))
+
+
+def _load_script_blocking(parent_package, name, reload):
+    with _load_lock:
+        # Note: Errors in the metadata have already been logged at this point
+        scripts = _discover_scripts(parent_package, names={name})
+        if len(scripts) == 0:
+            raise ScriptError('Metadata of script "{}" could not be read'.format(name))
+        if len(_install_dependencies(scripts, lock=False)) > 0:
+            raise ScriptError('Dependencies of script "{}" could not be installed'.format(name))
+        name, metadata = scripts[0]
+        return _import_script(parent_package, name, reload=reload), metadata
+
+
+@asyncio.coroutine
+def _reload_script(parent_package, name):
+    """
+    Stop a script, reload its module and start it again. Other scripts
+    keep running.
+
+    Arguments:
+        - `parent_package`: The name of the package containing the
+          script.
+        - `name`: The name of the script.
+
+    Return whether the script has been reloaded.
+    """
+    logger = _utils.get_logger()
+    logger.info('Reloading script "{}"', name)
+
+    try:
+        # Stop and unregister a script that has been removed
+        path = os.path.join(_utils.get_directory(), parent_package)
+        if not os.path.isdir(os.path.join(path, name)) \
+                and not os.path.isfile(os.path.join(path, name + '.py')):
+            logger.info('Script "{}" has been removed', name)
+            if name in _registry:
+                if not (yield from _registry.stop(name)):
+                    raise BadBehavingScriptError()
+                _registry.remove(name)
+            return True
+
+        yield from _registry.restart(name, reload=True)
+    except BadBehavingScriptError:
+        logger.error('Script "{}" did not stop in time, not reloading', name)
+        return False
+    except ScriptError as exc:
+        logger.exception(exc)
+        return False
+    return True
 
 
 def _stop_scripts(tasks):
@@ -270,89 +543,188 @@ def _stop_scripts(tasks):
     logger.info('Scripts cancelled')
 
 
-def _import_scripts():
+def _discover_scripts(parent_package, names=None):
     """
-    Import all scripts from the `scripts` package and install
-    dependencies.
+    Find all scripts of the `scripts` package and parse their
+    metadata.
+
+    Arguments:
+        - `parent_package`: The name of the package containing the
+          scripts.
+        - `names`: Only return scripts with these names if set.
 
     Return a list containing tuples of each scripts name and the
-    callback to the main function of the script.
+    metadata of the script.
     """
     logger = _utils.get_logger()
-
-    # Import parent package
-    parent_package = 'scripts'
-    importlib.import_module(parent_package, __name__)
-
-    # Import scripts from package
     path = os.path.join(_utils.get_directory(), parent_package)
+    cache = MetadataCache(os.path.join(path, '__pycache__'))
+    cache.load()
     scripts = []
     for importer, name, is_package in pkgutil.iter_modules([path]):
+        if names is not None and name not in names:
+            continue
         try:
             try:
                 # Get meta data
-                metadata = _scrape_metadata(path, name, is_package)
+                metadata = _scrape_metadata(cache, path, name, is_package)
                 logger.debug('Script "{}" metadata: {}', name, metadata)
-                # Get dependencies from meta data
-                dependencies = metadata.get('dependencies', ())
-                # Make to tuple if string
-                if isinstance(dependencies, str):
-                    dependencies = (dependencies,)
             except AttributeError:
-                dependencies = ()
+                metadata = {}
 
+            # Get dependencies from meta data
+            dependencies = metadata.get('dependencies', ())
+            # Make to tuple if string
+            if isinstance(dependencies, str):
+                dependencies = (dependencies,)
             try:
-                # Install dependencies
-                for dependency in dependencies:
-                    _utils.install_dependency(dependency)
+                metadata['dependencies'] = tuple(dependencies)
+                if not all((isinstance(dependency, str) for dependency in dependencies)):
+                    raise TypeError('Dependencies need to be strings')
             except TypeError as exc:
-                raise ScriptError() from exc
+                raise ScriptError('Script "{}" has invalid dependencies'.format(name)) from exc
 
             try:
-                # Import script
-                logger.debug('Importing script "{}"', name)
-                module = importlib.import_module('.' + name, parent_package)
-                main = getattr(module, 'main')
-                # Make sure that main is a co-routine
-                if not asyncio.iscoroutinefunction(main):
-                    raise ScriptError(
-                        'Main function of script "{}" is not a co-routine'.format(name))
-                scripts.append((name, main))
-            except (ImportError, AttributeError) as exc:
-                raise ImportScriptError(name) from exc
+                # Get priority class from meta data
+                priority = metadata.get('priority', Priority.normal.name)
+                metadata['priority'] = Priority[priority]
+            except (KeyError, TypeError) as exc:
+                raise ScriptError('Script "{}" has an invalid priority'.format(name)) from exc
+
+            # Check slow step threshold from meta data
+            threshold = metadata.get('slow_step_threshold')
+            if threshold is not None and (
+                    not isinstance(threshold, (int, float)) or threshold < 0):
+                raise ScriptError('Script "{}" has an invalid slow step threshold'.format(name))
+
+            scripts.append((name, metadata))
         except ScriptError as exc:
             # Note: We are not re-raising here because script errors should not
             #       affect other scripts that run fine
             logger.exception(exc)
 
-    # Return scripts list
+    # Store metadata of changed scripts
+    logger.debug('Metadata cache: {} hits, {} misses', cache.hits, cache.misses)
+    try:
+        cache.save(prune=names is None)
+    except OSError as exc:
+        logger.warning('Could not write metadata cache: {}', exc)
     return scripts
 
 
-def _scrape_metadata(path, name, is_package):
+def _install_dependencies(scripts, lock=True):
+    """
+    Install the dependencies of all scripts at once. Each dependency
+    will only be checked and installed once, even if multiple scripts
+    require it.
+
+    Arguments:
+        - `scripts`: A list containing tuples of each scripts name and
+          the metadata of the script.
+        - `lock`: Use and update the dependencies lock file.
+
+    Return a set of script names whose dependencies could not be
+    installed.
+    """
+    logger = _utils.get_logger()
+
+    # Map each dependency to the scripts that require it
+    dependencies = collections.OrderedDict()
+    for name, metadata in scripts:
+        for dependency in metadata['dependencies']:
+            dependencies.setdefault(dependency, []).append(name)
+
+    # Install dependencies
+    # Note: Only the scripts requiring a failed dependency will not be started
+    failed = set()
+    for dependency, exc in _utils.install_dependencies(dependencies, lock=lock).items():
+        logger.error(exc)
+        failed.update(dependencies[dependency])
+    return failed
+
+
+def _with_event_loop(loop, func, *args, **kwargs):
+    """
+    Call a function in a worker thread with the event loop set as the
+    current event loop of the thread, so module level code of scripts
+    that calls :func:`asyncio.get_event_loop` or creates locks, queues
+    or futures without passing the loop behaves like in the event loop
+    thread.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being used.
+        - `func`: The function to be called.
+        - `args`: Arguments that will be passed to the function.
+        - `kwargs`: Keyword arguments that will be passed to the
+          function.
+
+    Return the value `func` returns.
+    """
+    asyncio.set_event_loop(loop)
+    return func(*args, **kwargs)
+
+
+def _import_script(parent_package, name, reload=False):
+    """
+    Import a script.
+
+    Arguments:
+        - `parent_package`: The name of the package containing the
+          script.
+        - `name`: The name of the script.
+        - `reload`: Reload the script and its submodules if it has
+          been imported before.
+
+    Return the module of the script.
+    """
+    logger = _utils.get_logger()
+    try:
+        logger.debug('Importing script "{}"', name)
+        qualified_name = '{}.{}'.format(parent_package, name)
+        if reload:
+            # Note: New files will not be found without invalidating the caches
+            importlib.invalidate_caches()
+        if reload and qualified_name in sys.modules:
+            for module_name, module in list(sys.modules.items()):
+                if module_name != qualified_name \
+                        and not module_name.startswith(qualified_name + '.'):
+                    continue
+                # Note: Bytecode is validated by the modification time in seconds
+                #       and the size only which misses quick edits
+                try:
+                    os.remove(importlib.util.cache_from_source(module.__file__))
+                except (AttributeError, TypeError, NotImplementedError, OSError):
+                    pass
+                # Remove submodules of a script package, so they will be imported again
+                if module_name != qualified_name:
+                    del sys.modules[module_name]
+            module = importlib.reload(sys.modules[qualified_name])
+        else:
+            module = importlib.import_module('.' + name, parent_package)
+        main = getattr(module, 'main')
+        # Make sure that main is a co-routine
+        if not asyncio.iscoroutinefunction(main):
+            raise ScriptError('Main function of script "{}" is not a co-routine'.format(name))
+        return module
+    except ScriptError:
+        raise
+    except Exception as exc:
+        # Note: Module level code of a script may raise anything
+        raise ImportScriptError(name) from exc
+
+
+def _scrape_metadata(cache, path, name, is_package):
     # Update path
     if is_package:
         path = os.path.join(path, name, '__init__.py')
     else:
         path = os.path.join(path, name + '.py')
 
-    # Open script path
-    metadata = {}
-    with open(path) as file:
-        for line in file:
-            # Find metadata strings
-            if line.startswith('__'):
-                try:
-                    # Store key and value
-                    key, value = line.split('=', maxsplit=1)
-                    key = key.strip().strip('__')
-                    # Note: Literal eval tries to retrieve a value, assignments,
-                    #       calls, etc. are not possible
-                    value = ast.literal_eval(value.strip())
-                    metadata[key] = value
-                except (ValueError, SyntaxError) as exc:
-                    raise ImportScriptError(name) from exc
-    return metadata
+    # Get cached or extract metadata
+    try:
+        return cache.get(path)
+    except (ValueError, SyntaxError) as exc:
+        raise ImportScriptError(name) from exc
 
 
 def _script_done(task, name=None):
@@ -382,3 +754,7 @@ def _script_done(task, name=None):
                               ''.format(name)) from exc
     except ScriptError as exc:
         logger.exception(exc)
+
+    # Restart the script if it crashed and opted in
+    if _supervisor is not None:
+        _supervisor.script_done(task, name)
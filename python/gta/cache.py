@@ -0,0 +1,129 @@
+"""
+Cache the results of functions for the duration of a game tick.
+
+Intended for native functions that only read game state, such as
+``gta_native.player.player_ped_id``. Their result cannot change until
+the game advances to the next frame, so repeated calls within the same
+tick can be answered without calling into the game.
+
+Results expire when the event loop processes the next tick, the same
+tick the requirement poller of :func:`gta.events.wait` uses.
+"""
+import functools
+import weakref
+
+import gta
+import gta_native
+
+__all__ = ('TickCache', 'tick_cached', 'native', 'get_stats', 'clear')
+
+_caches = weakref.WeakSet()
+
+
+class TickCache:
+    """
+    Wrap a function and cache its results per positional arguments
+    until the next game tick.
+
+    .. note:: Keyword arguments are not supported and all arguments
+              need to be hashable.
+
+    Arguments:
+        - `func`: The function to be wrapped.
+    """
+    def __init__(self, func):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._tick = None
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+        _caches.add(self)
+
+    def __call__(self, *args):
+        # Note: Nothing can be cached before the tick wheel has been created
+        wheel = getattr(gta, '_tick_wheel', None)
+        if wheel is None:
+            return self._func(*args)
+
+        # Invalidate when the game advanced to another frame
+        tick = wheel.current
+        if tick != self._tick:
+            self._results = {}
+            self._tick = tick
+
+        try:
+            result = self._results[args]
+        except KeyError:
+            self.misses += 1
+            result = self._results[args] = self._func(*args)
+        else:
+            self.hits += 1
+        return result
+
+    def cache_clear(self):
+        """
+        Remove all cached results and reset the counters.
+        """
+        self._tick = None
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+
+
+def tick_cached(func):
+    """
+    Decorate a function that should only be called once per game tick
+    for the same arguments.
+
+    Example::
+
+        get_player_ped = tick_cached(native('player.player_ped_id'))
+
+    Arguments:
+        - `func`: The function to be wrapped.
+
+    Return a :class:`TickCache` instance.
+    """
+    return TickCache(func)
+
+
+def native(qualified_name):
+    """
+    Return a function that looks up a native function by its name on
+    each call and calls it. Wrappers that replace native functions
+    later, e.g. the ones of :mod:`gta.profiler`, will be called as
+    well.
+
+    Arguments:
+        - `qualified_name`: The namespace and the name of the native
+          function, e.g. ``'player.player_id'``.
+    """
+    namespace, name = qualified_name.split('.')
+
+    def _call(*args):
+        return getattr(getattr(gta_native, namespace), name)(*args)
+    _call.__name__ = name
+    _call.__qualname__ = qualified_name
+    return _call
+
+
+def get_stats():
+    """
+    Return a dict that maps the qualified name of each cached function
+    to a tuple containing the amount of hits and misses.
+    """
+    stats = {}
+    for cache in list(_caches):
+        name = getattr(cache, '__qualname__', repr(cache._func))
+        hits, misses = stats.get(name, (0, 0))
+        stats[name] = (hits + cache.hits, misses + cache.misses)
+    return stats
+
+
+def clear():
+    """
+    Clear the results and counters of all cached functions.
+    """
+    for cache in list(_caches):
+        cache.cache_clear()
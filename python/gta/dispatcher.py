@@ -0,0 +1,312 @@
+"""
+Dispatch key events to subscribers that are interested in them.
+"""
+import asyncio
+import collections
+
+from gta.enums import Overflow
+from gta.exceptions import KeyStreamOverflowError
+
+__all__ = ('KeySubscription', 'KeyWaiter', 'KeyStream', 'KeyDispatcher')
+
+
+class KeySubscription:
+    """
+    Abstract key event subscription.
+
+    Arguments:
+        - `codes`: A set of :class:`Key`s to watch for. Use ``None`` to
+          watch all keys.
+        - `down`: ``True`` for pressed keys, ``False`` for released
+          keys. Use ``None`` for both cases.
+        - `modifiers`: A dict of modifier keys that need to match.
+    """
+    def __init__(self, codes, down, modifiers):
+        self.codes = codes
+        self.down = down
+        self.modifiers = modifiers
+
+    def matches(self, modifiers):
+        """
+        Return whether the modifiers of a key event match the
+        subscription.
+
+        Arguments:
+            - `modifiers`: The modifiers of the key event.
+        """
+        return all((modifiers[key] == value for key, value in self.modifiers.items()))
+
+    def deliver(self, event):
+        """
+        Deliver a matching key event.
+
+        Arguments:
+            - `event`: A tuple containing `code`, `down` and
+              `modifiers` of the key event.
+
+        Return ``True`` if the subscription should remain subscribed.
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        """
+        Called when the subscription has been removed by the
+        dispatcher.
+        """
+        pass
+
+
+class KeyWaiter(KeySubscription):
+    """
+    A subscription that resolves a future with the first matching key
+    event.
+
+    Arguments:
+        - `future`: The :class:`asyncio.Future` that will be resolved.
+    """
+    def __init__(self, codes, down, modifiers, future):
+        super().__init__(codes, down, modifiers)
+        self.future = future
+
+    def deliver(self, event):
+        if not self.future.done():
+            self.future.set_result(event)
+        return False
+
+    def close(self):
+        self.future.cancel()
+
+
+class KeyStream(KeySubscription):
+    """
+    A subscription that buffers matching key events in a bounded ring
+    buffer, so no events are lost while the reader is busy.
+
+    Can be used as an asynchronous iterator and as a context manager
+    that closes the stream on exit.
+
+    Arguments:
+        - `dispatcher`: The :class:`KeyDispatcher` the stream is
+          subscribed to.
+        - `capacity`: The maximum amount of buffered key events.
+        - `overflow`: The :class:`Overflow` policy that will be applied
+          when the buffer is full.
+    """
+    def __init__(self, codes, down, modifiers, dispatcher, capacity=64,
+                 overflow=Overflow.drop_oldest):
+        super().__init__(codes, down, modifiers)
+        if capacity < 1:
+            raise ValueError('Capacity must be at least 1')
+        self._dispatcher = dispatcher
+        self._buffer = collections.deque()
+        self._waiter = None
+        self._overflowed = False
+        self.capacity = capacity
+        self.overflow = overflow
+        self.dropped = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self._buffer)
+
+    # Note: Python 3.5.0 expects __aiter__ to return an awaitable
+    @asyncio.coroutine
+    def __aiter__(self):
+        return self
+
+    @asyncio.coroutine
+    def __anext__(self):
+        event = yield from self.get()
+        if event is None:
+            raise StopAsyncIteration()
+        return event
+
+    def deliver(self, event):
+        if len(self._buffer) >= self.capacity:
+            self.dropped += 1
+            if self.overflow is Overflow.drop_oldest:
+                self._buffer.popleft()
+                self._buffer.append(event)
+            elif self.overflow is Overflow.error:
+                self._overflowed = True
+        else:
+            self._buffer.append(event)
+        self._wakeup()
+        return True
+
+    def close(self):
+        """
+        Unsubscribe from the dispatcher. Events that have already been
+        buffered can still be read.
+        """
+        self.closed = True
+        self._dispatcher.unsubscribe(self)
+        self._wakeup()
+
+    @asyncio.coroutine
+    def get(self):
+        """
+        Wait for the next key event.
+
+        Raise :class:`KeyStreamOverflowError` once when events have
+        been dropped and the overflow policy is :attr:`Overflow.error`.
+
+        Return a tuple containing the key event values for `code`,
+        `down` and `modifiers` or ``None`` if the stream has been
+        closed and the buffer is empty.
+        """
+        while True:
+            if self._overflowed:
+                self._overflowed = False
+                raise KeyStreamOverflowError(self.dropped)
+            if len(self._buffer) > 0:
+                return self._buffer.popleft()
+            if self.closed:
+                return None
+
+            # Wait until an event has been delivered or the stream is closed
+            self._waiter = asyncio.Future(loop=self._dispatcher.loop)
+            try:
+                yield from self._waiter
+            finally:
+                self._waiter = None
+
+    def _wakeup(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+class KeyDispatcher:
+    """
+    Index key event subscriptions by key code and `down` state, so a
+    key event only reaches subscriptions that are interested in it.
+
+    Subscriptions that watch all keys are stored in a wildcard bucket
+    for each `down` state.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` the futures will
+          be assigned to.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self._index = {}
+        self._wildcard = {True: set(), False: set()}
+
+    @staticmethod
+    def _keys(subscription):
+        downs = (True, False) if subscription.down is None else (subscription.down,)
+        codes = (None,) if subscription.codes is None else subscription.codes
+        return [(code, down) for code in codes for down in downs]
+
+    def subscribe(self, subscription):
+        """
+        Add a key event subscription.
+
+        Arguments:
+            - `subscription`: A :class:`KeySubscription` instance.
+        """
+        for code, down in self._keys(subscription):
+            if code is None:
+                self._wildcard[down].add(subscription)
+            else:
+                self._index.setdefault((code, down), set()).add(subscription)
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a key event subscription. Does nothing if the
+        subscription has already been removed.
+
+        Arguments:
+            - `subscription`: A :class:`KeySubscription` instance.
+        """
+        for code, down in self._keys(subscription):
+            if code is None:
+                self._wildcard[down].discard(subscription)
+            else:
+                bucket = self._index.get((code, down))
+                if bucket is not None:
+                    bucket.discard(subscription)
+                    # Remove empty buckets
+                    if len(bucket) == 0:
+                        del self._index[(code, down)]
+
+    def wait(self, codes, down, modifiers):
+        """
+        Wait for the first key event that matches.
+
+        Arguments:
+            - `codes`: A set of :class:`Key`s to watch for. Use
+              ``None`` to watch all keys.
+            - `down`: ``True`` for pressed keys, ``False`` for released
+              keys. Use ``None`` for both cases.
+            - `modifiers`: A dict of modifier keys that need to match.
+
+        Return a :class:`asyncio.Future` instance that will be resolved
+        with the key event tuple.
+        """
+        future = asyncio.Future(loop=self.loop)
+        waiter = KeyWaiter(codes, down, modifiers, future)
+        self.subscribe(waiter)
+        # Note: Removes the waiter when it has been cancelled as well
+        future.add_done_callback(lambda _: self.unsubscribe(waiter))
+        return future
+
+    def stream(self, codes, down, modifiers, capacity, overflow):
+        """
+        Buffer all matching key events in a :class:`KeyStream`.
+
+        Arguments:
+            - `codes`: A set of :class:`Key`s to watch for. Use
+              ``None`` to watch all keys.
+            - `down`: ``True`` for pressed keys, ``False`` for released
+              keys. Use ``None`` for both cases.
+            - `modifiers`: A dict of modifier keys that need to match.
+            - `capacity`: The maximum amount of buffered key events.
+            - `overflow`: The :class:`Overflow` policy that will be
+              applied when the buffer is full.
+
+        Return the subscribed :class:`KeyStream` instance.
+        """
+        stream = KeyStream(codes, down, modifiers, self, capacity=capacity,
+                           overflow=overflow)
+        self.subscribe(stream)
+        return stream
+
+    def dispatch(self, code, down, modifiers):
+        """
+        Deliver a key event to all matching subscriptions.
+
+        .. warning:: Must be called from within the event loop.
+
+        Arguments:
+            - `code`: The :class:`Key` of the key event.
+            - `down`: `True` if the key is pressed, `False` if the key
+              was just released.
+            - `modifiers`: Modifier keys pressed.
+        """
+        event = (code, down, modifiers)
+        # Note: A copy is required because subscriptions may unsubscribe
+        subscriptions = tuple(self._index.get((code, down), ()))
+        subscriptions += tuple(self._wildcard[down])
+        for subscription in subscriptions:
+            if subscription.matches(modifiers) and not subscription.deliver(event):
+                self.unsubscribe(subscription)
+
+    def clear(self):
+        """
+        Remove and close all subscriptions.
+        """
+        subscriptions = set(self._wildcard[True]) | self._wildcard[False]
+        for bucket in self._index.values():
+            subscriptions |= bucket
+        self._index = {}
+        self._wildcard = {True: set(), False: set()}
+        for subscription in subscriptions:
+            subscription.close()
@@ -3,7 +3,7 @@ Various enumerators for GTA V and events.
 """
 import enum
 
-__all__ = ('Key', 'Font')
+__all__ = ('Key', 'Font', 'Overflow', 'Priority')
 
 
 @enum.unique
@@ -151,3 +151,25 @@ class Font(enum.IntEnum):
     monospace = 2
     chalet_comprime_cologne = 4
     pricedown = 7
+
+
+@enum.unique
+class Overflow(enum.Enum):
+    """
+    The policy that will be applied when a key event buffer is full.
+    """
+    drop_oldest = 0  # Discard the oldest buffered event
+    drop_newest = 1  # Discard the incoming event
+    error = 2  # Discard the incoming event and raise on the next read
+
+
+@enum.unique
+class Priority(enum.IntEnum):
+    """
+    The priority class of a script. Steps of scripts with a higher
+    priority will be run first on each tick.
+    """
+    realtime = 0  # Has its own time budget per tick
+    high = 1
+    normal = 2
+    low = 3
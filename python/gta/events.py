@@ -1,15 +1,13 @@
 """
 Commonly used events that can be waited for.
 
-Every function returns a coroutine that has to be yielded from.
+Every function returns a coroutine that has to be yielded from, except
+for :func:`key_stream` which returns an asynchronous iterator.
 """
 import asyncio
-import functools
 import gta
 
-from gta import utils
-
-__all__ = ('tick', 'key', 'wait')
+__all__ = ('tick', 'key', 'key_stream', 'wait', 'yield_if_over_budget')
 
 
 @asyncio.coroutine
@@ -24,10 +22,9 @@ def tick(count=1):
     Arguments:
         - `count`: The amount of game ticks to wait for.
     """
-    ticks = 0
-    while count > ticks:
-        yield from asyncio.shield(getattr(gta, '_tick_future'))
-        ticks += 1
+    # Note: The future will be resolved exactly once, after the requested
+    #       amount of ticks
+    yield from getattr(gta, '_tick_wheel').wait(count)
     return
 
 
@@ -54,30 +51,40 @@ def key(codes=None, down=False, **modifiers):
     Return a tuple containing the actual key event values for `code`,
     `down` and `modifiers`.
     """
-    if isinstance(codes, gta.Key):
-        # Convert codes to tuple
-        codes = (codes,)
-    elif codes is not None and not isinstance(codes, set):
-        # Convert iterable to set
-        codes = set(codes)
+    codes = _normalise_codes(codes)
+
+    # Note: Only key events that match codes and down state will wake us up
+    dispatcher = getattr(gta, '_key_dispatcher')
+    return (yield from dispatcher.wait(codes, down, modifiers))
+
 
-    while True:
-        # Unpack key event
-        key_event = yield from asyncio.shield(getattr(gta, '_key_future'))
-        code, down_, modifiers_ = key_event
+def key_stream(codes=None, down=False, capacity=64, overflow=gta.Overflow.drop_oldest,
+               **modifiers):
+    """
+    Buffer key events that are pressed or released, so bursts of key
+    events can be processed without losing any of them.
 
-        # Check code
-        if codes is not None and code not in codes:
-            continue
-        # Check down
-        if down is not None and down != down_:
-            continue
-        # Check modifiers
-        if any((modifiers_[key_] != value for key_, value in modifiers.items())):
-            continue
+    Example::
 
-        # Return key event
-        return key_event
+        with key_stream(codes={Key.ADD, Key.SUBTRACT}) as stream:
+            while True:
+                code, down, modifiers = yield from stream.get()
+
+    Arguments:
+        - `code`: A single :class:`Key` or a list of :class:`Key`s to
+          watch for. Use ``None`` to watch all keys.
+        - `down`: ``True`` returns keys when pressed, ``False`` returns
+          keys when released. Use ``None`` for both cases.
+        - `capacity`: The maximum amount of buffered key events.
+        - `overflow`: The :class:`Overflow` policy that will be applied
+          when the buffer is full.
+        - `modifiers`: See :func:`key`.
+
+    Return a :class:`gta.dispatcher.KeyStream` instance that can be
+    iterated asynchronously and should be closed when no longer needed.
+    """
+    dispatcher = getattr(gta, '_key_dispatcher')
+    return dispatcher.stream(_normalise_codes(codes), down, modifiers, capacity, overflow)
 
 
 @asyncio.coroutine
@@ -95,17 +102,30 @@ def wait(require_func, *args, precision=10, **kwargs):
     Return the value `require_func` returns when the requirement is
     fulfilled.
     """
-    logger = utils.get_logger('gta.wait')
-
-    # Create partial
-    partial = functools.partial(require_func, *args, **kwargs)
-
-    # Poll until fulfilled
-    while True:
-        try:
-            result = partial()
-            logger.debug('{} fulfilled, result: {}', partial, result)
-            return result
-        except gta.RequirementError as exc:
-            logger.debug('{} not fulfilled, missing: {}', partial, exc.requirement)
-        yield from tick(count=precision)
+    # Note: Identical requirements are shared between waiters and evaluated
+    #       only once per tick
+    poller = getattr(gta, '_requirement_poller')
+    return (yield from poller.wait(require_func, *args, precision=precision, **kwargs))
+
+
+@asyncio.coroutine
+def yield_if_over_budget():
+    """
+    Let other scripts run until the next game tick if the time budget
+    of the current tick has been used up. Returns immediately
+    otherwise, so it is cheap to call this frequently in long running
+    loops.
+    """
+    scheduler = getattr(gta, '_frame_scheduler')
+    if scheduler.over_budget():
+        yield from scheduler.next_frame()
+
+
+def _normalise_codes(codes):
+    if isinstance(codes, gta.Key):
+        # Convert codes to tuple
+        return (codes,)
+    elif codes is not None and not isinstance(codes, set):
+        # Convert iterable to set
+        return set(codes)
+    return codes
@@ -1,6 +1,6 @@
 __all__ = ('ScriptError', 'ImportScriptError', 'InstallDependencyError',
            'DependencyBlacklistedError', 'ScriptExecutionError', 'BadBehavingScriptError',
-           'RequirementError')
+           'RequirementError', 'KeyStreamOverflowError', 'UnknownScriptError')
 
 
 class ScriptError(Exception):
@@ -85,3 +85,32 @@ class RequirementError(ScriptError):
 
     def __str__(self):
         return 'Missing: {}'.format(self.requirement)
+
+
+class KeyStreamOverflowError(ScriptError):
+    """
+    Key events have been dropped because the buffer of a key stream
+    was full.
+
+    Arguments:
+        - `dropped`: The amount of key events that have been dropped.
+    """
+    def __init__(self, dropped):
+        self.dropped = dropped
+
+    def __str__(self):
+        return 'Key stream dropped {} event(s)'.format(self.dropped)
+
+
+class UnknownScriptError(ScriptError):
+    """
+    A script has not been loaded.
+
+    Arguments:
+        - `name`: The name of the script.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return 'Script "{}" has not been loaded'.format(self.name)
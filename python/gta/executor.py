@@ -0,0 +1,191 @@
+"""
+Run CPU or I/O heavy work outside of the event loop thread, so other
+scripts are not blocked by it.
+
+Example::
+
+    import pathfinding
+
+    result = yield from gta.executor.run_cpu(pathfinding.find_path, nodes, start, end)
+
+.. note:: Functions passed to :func:`run_cpu` and their arguments need
+          to be picklable, e.g. functions defined at the top level of
+          a module. The worker process imports that module, but the
+          native functions only exist inside the game. Therefore, the
+          module must not import :mod:`gta`, :mod:`gta_native` or a
+          script. Put such functions into a separate package the
+          script depends on, e.g. ``pathfinding.find_path``.
+"""
+import asyncio
+import concurrent.futures
+import concurrent.futures.process
+import functools
+import os
+import multiprocessing
+import sys
+import types
+
+import gta
+
+from gta.exceptions import ScriptError
+
+__all__ = ('run_cpu', 'run_io', 'shutdown')
+
+# The maximum amount of worker processes, defaults to the amount of CPUs
+max_processes = None
+# The maximum amount of worker threads
+max_threads = 4
+# The maximum amount of concurrent jobs per script
+script_limit = 2
+
+_process_pool = None
+_thread_pool = None
+_semaphores = {}
+
+
+def _python_executable():
+    """
+    Return the path to the Python interpreter worker processes will
+    be started with.
+    """
+    # Note: When embedded, sys.executable points to the game executable
+    name = os.path.basename(sys.executable or '').lower()
+    if name.startswith('python'):
+        return sys.executable
+    return os.path.join(sys.exec_prefix, 'python.exe' if os.name == 'nt' else 'python3')
+
+
+def _get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        multiprocessing.set_executable(_python_executable())
+        _process_pool = concurrent.futures.ProcessPoolExecutor(max_workers=max_processes)
+    return _process_pool
+
+
+def _drop_process_pool(pool):
+    # Note: A broken pool rejects all jobs, so a new one has to be started
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    pool.shutdown(wait=False)
+
+
+def _requires_game(module_name):
+    return module_name.partition('.')[0] in ('gta', 'gta_native', '_gta_native', 'scripts')
+
+
+def _check_importable(func):
+    """
+    Raise :class:`ScriptError` if the module of a function can not be
+    imported by a worker process because it requires the game.
+
+    Arguments:
+        - `func`: The function that will be run in a worker process.
+    """
+    while isinstance(func, functools.partial):
+        func = func.func
+    module_name = getattr(func, '__module__', None)
+    module = sys.modules.get(module_name)
+    if module is None:
+        return
+
+    # Check the module itself and everything it imported
+    names = [module_name]
+    for value in vars(module).values():
+        if isinstance(value, types.ModuleType):
+            names.append(value.__name__)
+        else:
+            name = getattr(value, '__module__', None)
+            if isinstance(name, str):
+                names.append(name)
+    if any(_requires_game(name) for name in names):
+        raise ScriptError(('Function "{}" can not be run in a worker process because '
+                           'module "{}" requires the game').format(
+            getattr(func, '__qualname__', func), module_name))
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_threads)
+    return _thread_pool
+
+
+def _get_semaphore(loop):
+    # Limit concurrent jobs of the script the current task belongs to
+    task = asyncio.Task.current_task(loop=loop)
+    script = getattr(task, 'script', None)
+    semaphore = _semaphores.get(script)
+    if semaphore is None:
+        semaphore = _semaphores[script] = asyncio.Semaphore(script_limit, loop=loop)
+    return semaphore
+
+
+@asyncio.coroutine
+def _run(pool, func, args, kwargs):
+    loop = getattr(gta, '_loop') or asyncio.get_event_loop()
+    with (yield from _get_semaphore(loop)):
+        return (yield from loop.run_in_executor(pool, functools.partial(func, *args, **kwargs)))
+
+
+@asyncio.coroutine
+def run_cpu(func, *args, **kwargs):
+    """
+    Run a CPU bound function in a worker process.
+
+    Arguments:
+        - `func`: A picklable function whose module does not import
+          :mod:`gta`, :mod:`gta_native` or a script.
+        - `args`: Arguments that will be passed to the function.
+        - `kwargs`: Keyword arguments that will be passed to the
+          function.
+
+    Raise :class:`ScriptError` if the module of `func` requires the
+    game.
+
+    Return the value `func` returns.
+    """
+    _check_importable(func)
+    pool = _get_process_pool()
+    try:
+        return (yield from _run(pool, func, args, kwargs))
+    except concurrent.futures.process.BrokenProcessPool:
+        _drop_process_pool(pool)
+        raise
+
+
+@asyncio.coroutine
+def run_io(func, *args, **kwargs):
+    """
+    Run a blocking I/O bound function in a worker thread.
+
+    .. warning:: Do not call native functions from the worker thread!
+
+    Arguments:
+        - `func`: A function.
+        - `args`: Arguments that will be passed to the function.
+        - `kwargs`: Keyword arguments that will be passed to the
+          function.
+
+    Return the value `func` returns.
+    """
+    return (yield from _run(_get_thread_pool(), func, args, kwargs))
+
+
+def shutdown(wait=False):
+    """
+    Shut down the worker pools that have been started.
+
+    .. warning:: Do not call this function from a script!
+
+    Arguments:
+        - `wait`: Wait until pending jobs have been completed.
+    """
+    global _process_pool, _thread_pool
+    for pool in (_process_pool, _thread_pool):
+        if pool is not None:
+            pool.shutdown(wait=wait)
+    _process_pool = None
+    _thread_pool = None
+    _semaphores.clear()
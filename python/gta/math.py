@@ -0,0 +1,368 @@
+"""
+Vectors for calculations in scripts.
+
+Every attribute access on :class:`gta_native.Vector3` goes through the
+attribute lookup of the SWIG wrapper, and the wrapper has no
+arithmetic. Convert native vectors to :class:`Vector3` once and
+calculate with those instead::
+
+    position = Vector3.from_native(gta_native.entity.get_entity_coords(ped, True))
+    if position.distance(target) < 10.0:
+        ...
+
+:class:`Vector3Array` stores many positions in a single buffer for
+batch queries such as finding the nearest entity. It uses NumPy if it
+is installed and falls back to the :mod:`array` module otherwise.
+"""
+import array
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import gta_native
+
+__all__ = ('Vector3', 'Vector3Array')
+
+# Use NumPy for vector arrays if it is installed
+use_numpy = numpy is not None
+
+
+class Vector3:
+    """
+    A vector with three components.
+
+    Vectors support addition and subtraction of vectors, multiplication
+    and division by numbers and negation. They can be unpacked into
+    their components::
+
+        x, y, z = vector
+
+    Arguments:
+        - `x`: The x component.
+        - `y`: The y component.
+        - `z`: The z component.
+    """
+
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @classmethod
+    def from_native(cls, vector):
+        """
+        Create a vector from a :class:`gta_native.Vector3` instance or
+        any other object that has `x`, `y` and `z` attributes.
+
+        Arguments:
+            - `vector`: The vector to be converted.
+        """
+        return cls(vector.x, vector.y, vector.z)
+
+    def to_native(self):
+        """
+        Return a new :class:`gta_native.Vector3` instance that can be
+        passed to native functions.
+        """
+        vector = gta_native.Vector3()
+        vector.x, vector.y, vector.z = self.x, self.y, self.z
+        return vector
+
+    def __repr__(self):
+        return 'Vector3({!r}, {!r}, {!r})'.format(self.x, self.y, self.z)
+
+    def __iter__(self):
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def __eq__(self, other):
+        if not isinstance(other, Vector3):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y and self.z == other.z
+
+    # Note: Vectors are mutable
+    __hash__ = None
+
+    def __add__(self, other):
+        if not isinstance(other, Vector3):
+            return NotImplemented
+        return Vector3(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        if not isinstance(other, Vector3):
+            return NotImplemented
+        return Vector3(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, scalar):
+        if isinstance(scalar, Vector3):
+            return NotImplemented
+        return Vector3(self.x * scalar, self.y * scalar, self.z * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        if isinstance(scalar, Vector3):
+            return NotImplemented
+        return Vector3(self.x / scalar, self.y / scalar, self.z / scalar)
+
+    def __neg__(self):
+        return Vector3(-self.x, -self.y, -self.z)
+
+    def __abs__(self):
+        return self.length()
+
+    def copy(self):
+        """
+        Return a copy of the vector.
+        """
+        return Vector3(self.x, self.y, self.z)
+
+    def dot(self, other):
+        """
+        Return the dot product of two vectors.
+
+        Arguments:
+            - `other`: The other :class:`Vector3` instance.
+        """
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other):
+        """
+        Return the cross product of two vectors.
+
+        Arguments:
+            - `other`: The other :class:`Vector3` instance.
+        """
+        return Vector3(self.y * other.z - self.z * other.y,
+                       self.z * other.x - self.x * other.z,
+                       self.x * other.y - self.y * other.x)
+
+    def length(self):
+        """
+        Return the length of the vector.
+        """
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def length_squared(self):
+        """
+        Return the squared length of the vector. Cheaper than
+        :meth:`length` when lengths only need to be compared.
+        """
+        return self.x * self.x + self.y * self.y + self.z * self.z
+
+    def distance(self, other):
+        """
+        Return the distance between two points.
+
+        Arguments:
+            - `other`: The other :class:`Vector3` instance.
+        """
+        return math.sqrt(self.distance_squared(other))
+
+    def distance_squared(self, other):
+        """
+        Return the squared distance between two points.
+
+        Arguments:
+            - `other`: The other :class:`Vector3` instance.
+        """
+        x, y, z = self.x - other.x, self.y - other.y, self.z - other.z
+        return x * x + y * y + z * z
+
+    def normalized(self):
+        """
+        Return a vector with the same direction and a length of ``1``.
+
+        Raise :class:`ZeroDivisionError` if the vector has no length.
+        """
+        return self / self.length()
+
+
+class Vector3Array:
+    """
+    A growable array of points stored in a single buffer for batch
+    queries.
+
+    The buffer is a NumPy array if NumPy is installed and
+    :data:`use_numpy` is set. Otherwise, the components are stored in
+    three :class:`array.array` instances.
+
+    Example::
+
+        peds = [...]
+        positions = Vector3Array(
+            Vector3.from_native(gta_native.entity.get_entity_coords(ped, True))
+            for ped in peds)
+        index, distance = positions.nearest(player_position)
+        nearest_ped = peds[index]
+
+    Arguments:
+        - `vectors`: An iterable of :class:`Vector3` instances or any
+          other objects that have `x`, `y` and `z` attributes, e.g.
+          :class:`gta_native.Vector3` instances.
+    """
+    def __init__(self, vectors=()):
+        self._numpy = use_numpy
+        self.clear()
+        self.extend(vectors)
+
+    @property
+    def backend(self):
+        """
+        The name of the module the buffer is stored in (``'numpy'`` or
+        ``'array'``).
+        """
+        return 'numpy' if self._numpy else 'array'
+
+    def __repr__(self):
+        return '<Vector3Array size={}, backend={}>'.format(self._size, self.backend)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('Vector3Array index out of range')
+        if self._numpy:
+            return Vector3(*self._data[index].tolist())
+        else:
+            return Vector3(self._xs[index], self._ys[index], self._zs[index])
+
+    def __iter__(self):
+        if self._numpy:
+            return (Vector3(*row) for row in self._data[:self._size].tolist())
+        else:
+            return (Vector3(*point) for point in zip(self._xs, self._ys, self._zs))
+
+    def append(self, vector):
+        """
+        Add a point to the end of the array.
+
+        Arguments:
+            - `vector`: A :class:`Vector3` instance or any other object
+              that has `x`, `y` and `z` attributes.
+        """
+        self.extend((vector,))
+
+    def extend(self, vectors):
+        """
+        Add points to the end of the array.
+
+        Arguments:
+            - `vectors`: An iterable of :class:`Vector3` instances or
+              any other objects that have `x`, `y` and `z` attributes.
+        """
+        points = [(vector.x, vector.y, vector.z) for vector in vectors]
+        if self._numpy:
+            size = self._size + len(points)
+            # Note: Grow the buffer exponentially, so appending is cheap
+            if size > len(self._data):
+                data = numpy.empty((max(size, 2 * len(self._data)), 3))
+                data[:self._size] = self._data[:self._size]
+                self._data = data
+            if len(points) > 0:
+                self._data[self._size:size] = points
+        else:
+            for x, y, z in points:
+                self._xs.append(x)
+                self._ys.append(y)
+                self._zs.append(z)
+        self._size += len(points)
+
+    def clear(self):
+        """
+        Remove all points.
+        """
+        self._size = 0
+        if self._numpy:
+            self._data = numpy.empty((0, 3))
+        else:
+            self._xs, self._ys, self._zs = array.array('d'), array.array('d'), array.array('d')
+
+    def distances(self, point):
+        """
+        Return the distances between a point and all points of the
+        array as a sequence of floats (a NumPy array if NumPy is used).
+
+        Arguments:
+            - `point`: A :class:`Vector3` instance.
+        """
+        if self._numpy:
+            return numpy.sqrt(self._distances_squared(point))
+        else:
+            sqrt = math.sqrt
+            return array.array('d', (sqrt(distance)
+                                     for distance in self._distances_squared(point)))
+
+    def within(self, point, radius):
+        """
+        Return a list of the indexes of all points that are within a
+        radius around a point.
+
+        Arguments:
+            - `point`: A :class:`Vector3` instance.
+            - `radius`: The maximum distance.
+        """
+        limit = radius * radius
+        distances = self._distances_squared(point)
+        if self._numpy:
+            return numpy.flatnonzero(distances <= limit).tolist()
+        else:
+            return [index for index, distance in enumerate(distances) if distance <= limit]
+
+    def nearest(self, point):
+        """
+        Find the point of the array that is closest to another point.
+
+        Arguments:
+            - `point`: A :class:`Vector3` instance.
+
+        Raise :class:`ValueError` if the array is empty.
+
+        Return a tuple containing the index of the nearest point and
+        its distance.
+        """
+        if self._size == 0:
+            raise ValueError('Vector3Array is empty')
+        distances = self._distances_squared(point)
+        if self._numpy:
+            index = int(numpy.argmin(distances))
+            distance = float(distances[index])
+        else:
+            distance, index = min(zip(distances, range(self._size)))
+        return index, math.sqrt(distance)
+
+    def bounds(self):
+        """
+        Return the smallest axis-aligned box that contains all points
+        as a tuple of the minimum and maximum :class:`Vector3`
+        instance.
+
+        Raise :class:`ValueError` if the array is empty.
+        """
+        if self._size == 0:
+            raise ValueError('Vector3Array is empty')
+        if self._numpy:
+            data = self._data[:self._size]
+            return Vector3(*data.min(axis=0).tolist()), Vector3(*data.max(axis=0).tolist())
+        else:
+            columns = (self._xs, self._ys, self._zs)
+            return (Vector3(*(min(column) for column in columns)),
+                    Vector3(*(max(column) for column in columns)))
+
+    def _distances_squared(self, point):
+        if self._numpy:
+            difference = self._data[:self._size] - (point.x, point.y, point.z)
+            return numpy.einsum('ij,ij->i', difference, difference)
+        else:
+            x, y, z = point.x, point.y, point.z
+            return [(x_ - x) ** 2 + (y_ - y) ** 2 + (z_ - z) ** 2
+                    for x_, y_, z_ in zip(self._xs, self._ys, self._zs)]
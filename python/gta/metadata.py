@@ -0,0 +1,130 @@
+"""
+Extract the metadata of scripts and cache it on disk, so scripts that
+have not changed since the last startup do not need to be parsed.
+"""
+import ast
+import os
+import re
+
+__all__ = ('MetadataCache', 'extract_metadata')
+
+# Name of the cache file inside the `__pycache__` directory of the scripts package
+cache_file = 'metadata.cache'
+
+# Note: Needs to be increased when the format of the cache or the extracted
+#       metadata changes
+_cache_version = 1
+_metadata_name = re.compile(r'^__(\w+)__$')
+
+
+def extract_metadata(path):
+    """
+    Extract the metadata of a script. Metadata are assignments of
+    literals to names like ``__version__`` at the top level of the
+    script. Values may span multiple lines.
+
+    Arguments:
+        - `path`: The path to the script file.
+
+    Raise :class:`ValueError` or :class:`SyntaxError` if the script
+    could not be parsed or a metadata value is not a literal.
+
+    Return a dict that maps metadata names without the surrounding
+    underscores to their values.
+    """
+    with open(path, 'rb') as file:
+        tree = ast.parse(file.read(), filename=path)
+
+    metadata = {}
+    for node in tree.body:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target = node.targets[0]
+        if not isinstance(target, ast.Name):
+            continue
+        match = _metadata_name.match(target.id)
+        if match is not None:
+            # Note: Literal eval tries to retrieve a value, assignments,
+            #       calls, etc. are not possible
+            metadata[match.group(1)] = ast.literal_eval(node.value)
+    return metadata
+
+
+class MetadataCache:
+    """
+    Metadata of scripts keyed by the path, modification time and size
+    of the script files.
+
+    Arguments:
+        - `directory`: The directory the cache file is stored in.
+    """
+    def __init__(self, directory):
+        self.path = os.path.join(directory, cache_file)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._seen = set()
+        self._changed = False
+
+    def load(self):
+        """
+        Load the cache file. A missing or invalid cache file results in
+        an empty cache.
+        """
+        try:
+            with open(self.path) as file:
+                content = ast.literal_eval(file.read())
+            if content.get('version') == _cache_version:
+                self._entries = content['entries']
+        except (OSError, ValueError, SyntaxError, AttributeError, KeyError):
+            self._entries = {}
+
+    def save(self, prune=True):
+        """
+        Write the cache file if it has changed.
+
+        Arguments:
+            - `prune`: Remove entries of scripts that have not been
+              requested since loading.
+        """
+        entries = self._entries
+        if prune:
+            entries = {path: entry for path, entry in entries.items() if path in self._seen}
+        if not self._changed and len(entries) == len(self._entries):
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        # Note: Replacing the file prevents leaving a truncated cache behind
+        temporary_path = self.path + '.tmp'
+        with open(temporary_path, 'w') as file:
+            file.write(repr({'version': _cache_version, 'entries': entries}))
+        os.replace(temporary_path, self.path)
+        self._entries = entries
+        self._changed = False
+
+    def get(self, path):
+        """
+        Return the metadata of a script. The script will only be parsed
+        if it has changed since the metadata has been cached.
+
+        Arguments:
+            - `path`: The path to the script file.
+
+        Raise :class:`ValueError` or :class:`SyntaxError` if the
+        script could not be parsed.
+        """
+        path = os.path.abspath(path)
+        self._seen.add(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return dict(entry[1])
+
+        self.misses += 1
+        metadata = extract_metadata(path)
+        self._entries[path] = (key, metadata)
+        self._changed = True
+        return dict(metadata)
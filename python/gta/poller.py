@@ -0,0 +1,211 @@
+"""
+Evaluate requirements that are being waited for on behalf of all
+scripts.
+"""
+import asyncio
+import functools
+
+from gta.exceptions import RequirementError
+
+__all__ = ('RequirementPoller',)
+
+
+class Poll:
+    """
+    A requirement that is being polled for one or more waiters.
+
+    Arguments:
+        - `key`: A hashable key that identifies the requirement or
+          ``None`` if the requirement cannot be shared.
+        - `partial`: The requirement function with its arguments.
+        - `precision`: The amount of game ticks between checks.
+    """
+    def __init__(self, key, partial, precision):
+        self.key = key
+        self.partial = partial
+        self.precision = precision
+        self.waiters = set()
+        self.handle = None
+        self.expires = None
+        self.failures = 0
+        self.logged = None
+
+
+class RequirementPoller:
+    """
+    Deduplicate waiters that wait for the same requirement function
+    with the same arguments. Each requirement is evaluated at most once
+    per game tick and the result is handed to all of its waiters.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` the futures will
+          be assigned to.
+        - `wheel`: The :class:`gta.timer.TickWheel` that schedules the
+          checks.
+        - `logger`: The logger failed attempts will be logged to.
+        - `log_interval`: The minimum amount of seconds between two
+          log messages about the same unfulfilled requirement.
+    """
+    def __init__(self, loop, wheel, logger, log_interval=5.0):
+        self._loop = loop
+        self._wheel = wheel
+        self._logger = logger
+        self._polls = {}
+        self._cache = {}
+        self._cache_tick = None
+        self.log_interval = log_interval
+
+    def __len__(self):
+        """
+        Return the amount of shared requirements that are being polled.
+        """
+        return len(self._polls)
+
+    def wait(self, require_func, *args, precision=10, **kwargs):
+        """
+        Wait for a requirement to be fulfilled.
+
+        Arguments:
+            - `require_func`: A function from the :mod:`requires`
+              package.
+            - `precision`: The amount of game ticks to wait between
+              checks.
+            - `args`: Arguments that will be passed to the function.
+            - `kwargs`: Keyword arguments that will be passed to the
+              function.
+
+        Return a :class:`asyncio.Future` instance that will be resolved
+        with the value `require_func` returns when the requirement is
+        fulfilled.
+        """
+        key = self._make_key(require_func, args, kwargs)
+        poll = self._polls.get(key) if key is not None else None
+        if poll is None:
+            partial = functools.partial(require_func, *args, **kwargs)
+            poll = Poll(key, partial, precision)
+            if key is not None:
+                self._polls[key] = poll
+        else:
+            poll.precision = min(poll.precision, precision)
+
+        # Add waiter
+        future = asyncio.Future(loop=self._loop)
+        poll.waiters.add(future)
+        future.add_done_callback(functools.partial(self._remove_waiter, poll))
+
+        # Check now and schedule the next check if not fulfilled
+        if self._check(poll):
+            self._schedule(poll, precision)
+        return future
+
+    def clear(self):
+        """
+        Stop polling and cancel all waiters.
+        """
+        polls, self._polls = self._polls, {}
+        self._cache = {}
+        for poll in polls.values():
+            self._remove(poll)
+            for waiter in list(poll.waiters):
+                waiter.cancel()
+
+    @staticmethod
+    def _make_key(require_func, args, kwargs):
+        key = (require_func, args, frozenset(kwargs.items()))
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable arguments, the requirement cannot be shared
+            return None
+        return key
+
+    def _evaluate(self, poll):
+        if poll.key is None:
+            return poll.partial()
+
+        # Invalidate cache when the tick advanced
+        tick = self._wheel.current
+        if tick != self._cache_tick:
+            self._cache = {}
+            self._cache_tick = tick
+
+        # Evaluate once per tick
+        try:
+            result, exc = self._cache[poll.key]
+        except KeyError:
+            try:
+                result, exc = poll.partial(), None
+            except RequirementError as exc_:
+                result, exc = None, exc_
+            self._cache[poll.key] = (result, exc)
+        if exc is not None:
+            raise exc
+        return result
+
+    def _check(self, poll):
+        """
+        Evaluate a requirement and resolve the waiters if fulfilled.
+
+        Return ``True`` if the requirement is still pending.
+        """
+        try:
+            result = self._evaluate(poll)
+        except RequirementError as exc:
+            self._log_failure(poll, exc)
+            return True
+        except Exception as exc:
+            # Hand unexpected exceptions to the waiters
+            self._remove(poll)
+            for waiter in list(poll.waiters):
+                if not waiter.done():
+                    waiter.set_exception(exc)
+            return False
+
+        # Fulfilled
+        if self._logger.debug_enabled:
+            self._logger.debug('{} fulfilled, result: {}', poll.partial, result)
+        self._remove(poll)
+        for waiter in list(poll.waiters):
+            if not waiter.done():
+                waiter.set_result(result)
+        return False
+
+    def _log_failure(self, poll, exc):
+        poll.failures += 1
+        if not self._logger.debug_enabled:
+            return
+        now = self._loop.time()
+        if poll.logged is None or now - poll.logged >= self.log_interval:
+            poll.logged = now
+            self._logger.debug('{} not fulfilled after {} attempt(s), missing: {}',
+                               poll.partial, poll.failures, exc.requirement)
+
+    def _schedule(self, poll, precision):
+        expires = self._wheel.current + precision
+        if poll.handle is not None and not poll.handle.done():
+            # Keep the pending check if it happens earlier
+            if poll.expires <= expires:
+                return
+            poll.handle.cancel()
+        poll.expires = expires
+        poll.handle = self._wheel.wait(precision)
+        poll.handle.add_done_callback(functools.partial(self._expired, poll))
+
+    def _expired(self, poll, handle):
+        if handle.cancelled() or handle is not poll.handle:
+            return
+        poll.handle = None
+        if self._check(poll):
+            self._schedule(poll, poll.precision)
+
+    def _remove_waiter(self, poll, future):
+        poll.waiters.discard(future)
+        if len(poll.waiters) == 0:
+            self._remove(poll)
+
+    def _remove(self, poll):
+        if poll.handle is not None:
+            poll.handle.cancel()
+            poll.handle = None
+        if poll.key is not None and self._polls.get(poll.key) is poll:
+            del self._polls[poll.key]
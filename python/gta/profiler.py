@@ -0,0 +1,285 @@
+"""
+Count and time native function calls.
+
+Profiling is disabled by default and has no cost in that case because
+the native functions will not be touched. It can be enabled by setting
+the environment variable ``GTA_NATIVE_PROFILE`` before the game starts
+or by calling :func:`enable`. The value of the environment variable
+may be one of ``1``, ``true``, ``yes`` or ``on`` to log the report
+or a path to write the report into that file. ``0``, ``false``,
+``no``, ``off`` and an empty value disable profiling.
+"""
+import asyncio
+import functools
+import os
+import sys
+import time
+
+import gta
+import gta_native
+
+__all__ = ('LatencyStats', 'NativeStats', 'Profiler', 'enable', 'enable_from_environment', 'disable',
+           'is_enabled', 'get_stats', 'dump')
+
+environment_variable = 'GTA_NATIVE_PROFILE'
+# Values of the environment variable that are not paths
+_enabled_values = ('1', 'true', 'yes', 'on')
+_disabled_values = ('', '0', 'false', 'no', 'off')
+
+_profiler = None
+
+
+class LatencyStats:
+    """
+    Amount and latencies of calls.
+
+    Latencies are recorded in a histogram with power-of-two buckets
+    in microseconds, so percentiles are approximations (upper bound of
+    the bucket).
+    """
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * 32
+
+    def record(self, duration):
+        self.calls += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        bucket = min(int(duration * 1000000).bit_length(), len(self.histogram) - 1)
+        self.histogram[bucket] += 1
+
+    def percentile(self, percent):
+        """
+        Return the approximated latency in seconds that `percent` of
+        the calls did not exceed.
+
+        Arguments:
+            - `percent`: A percentage between ``0`` and ``100``.
+        """
+        threshold = self.calls * percent / 100
+        count = 0
+        for bucket, amount in enumerate(self.histogram):
+            count += amount
+            if count >= threshold and amount > 0:
+                return min((1 << bucket) / 1000000, self.max)
+        return self.max
+
+
+class NativeStats(LatencyStats):
+    """
+    Call statistics of a native function. The calls of each script are
+    recorded in a :class:`LatencyStats` instance as well.
+    """
+    def __init__(self):
+        super().__init__()
+        self.scripts = {}
+
+    def record(self, duration, script=None):
+        super().record(duration)
+        stats = self.scripts.get(script)
+        if stats is None:
+            stats = self.scripts[script] = LatencyStats()
+        stats.record(duration)
+
+
+class Profiler:
+    """
+    Replaces the functions of all native namespaces with wrappers that
+    record call statistics.
+
+    Namespaces of the package layout that have not been imported yet
+    will be wrapped once they are imported, so profiling does not
+    import all namespaces.
+    """
+    def __init__(self):
+        self.stats = {}
+        self._originals = []
+        self._wrapped = set()
+
+    def install(self):
+        """
+        Wrap all native functions.
+        """
+        # Note: The hook is added first, so no namespace can be missed
+        hooks = getattr(gta_native, '__import_hooks__', None)
+        if hooks is not None:
+            hooks.append(self.wrap_namespace)
+        for namespace_name, namespace in _namespaces():
+            self.wrap_namespace(namespace_name, namespace)
+
+    def uninstall(self):
+        """
+        Restore the original native functions.
+        """
+        hooks = getattr(gta_native, '__import_hooks__', None)
+        if hooks is not None and self.wrap_namespace in hooks:
+            hooks.remove(self.wrap_namespace)
+        for namespace, name, value in reversed(self._originals):
+            setattr(namespace, name, value)
+        self._originals = []
+        self._wrapped = set()
+
+    def wrap_namespace(self, namespace_name, namespace):
+        """
+        Wrap the native functions of a namespace. Namespaces will only
+        be wrapped once.
+
+        Arguments:
+            - `namespace_name`: The name of the namespace.
+            - `namespace`: The namespace class or module.
+        """
+        if namespace_name in self._wrapped:
+            return
+        self._wrapped.add(namespace_name)
+        for name, value in list(vars(namespace).items()):
+            if name.startswith('__') or name in ('_gta_native', '_namespace_imported'):
+                continue
+            func = getattr(namespace, name)
+            if not callable(func) or isinstance(func, type):
+                continue
+            wrapper = self._wrap('{}.{}'.format(namespace_name, name), func)
+            # Note: Functions of a class namespace have to stay static
+            if isinstance(namespace, type):
+                wrapper = staticmethod(wrapper)
+            self._originals.append((namespace, name, value))
+            setattr(namespace, name, wrapper)
+
+    def _wrap(self, qualified_name, func):
+        stats = self.stats.setdefault(qualified_name, NativeStats())
+        perf_counter = time.perf_counter
+
+        @functools.wraps(func)
+        def _profiled(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.record(perf_counter() - start, self._script_name())
+        return _profiled
+
+    def _script_name(self):
+        # Note: Profiling may be enabled before the loop has been created
+        loop = getattr(gta, '_loop', None)
+        if loop is None:
+            return None
+        task = asyncio.Task.current_task(loop=loop)
+        return getattr(task, 'script', None)
+
+    def report(self):
+        """
+        Return a list of report lines sorted by the cumulative time
+        spent in each native function.
+        """
+        row = '{:<56} {:>9} {:>11} {:>9} {:>9} {:>9} {:>9} {:>9}'
+        lines = [row.format('Native', 'Calls', 'Total (ms)', 'Mean (us)', 'P50 (us)',
+                            'P90 (us)', 'P99 (us)', 'Max (us)')]
+        stats = sorted(((name, stats_) for name, stats_ in self.stats.items()
+                        if stats_.calls > 0), key=lambda item: item[1].total, reverse=True)
+        for name, stats_ in stats:
+            lines.append(self._row(row, name, stats_))
+            # Break down by calling script
+            scripts = sorted(stats_.scripts.items(), key=lambda item: item[1].total,
+                             reverse=True)
+            for script, script_stats in scripts:
+                lines.append(self._row(row, '    ' + (script or '<unknown>'), script_stats))
+        return lines
+
+    @staticmethod
+    def _row(row, name, stats):
+        return row.format(
+            name, stats.calls, '{:.3f}'.format(stats.total * 1000),
+            *('{:.1f}'.format(value * 1000000) for value in (
+                stats.total / stats.calls, stats.percentile(50),
+                stats.percentile(90), stats.percentile(99), stats.max)))
+
+
+def _namespaces():
+    """
+    Return an iterable of namespace name and namespace tuples of the
+    :mod:`gta_native` module or package. Only namespaces of the package
+    that have already been imported will be returned.
+    """
+    names = getattr(gta_native, '__namespaces__', None)
+    if names is not None:
+        # Note: Accessing a namespace of the package would import it
+        modules = ((name, sys.modules.get('{}.{}'.format(gta_native.__name__, name)))
+                   for name in names)
+        return [(name, module) for name, module in modules if module is not None]
+
+    # Find namespace classes of the single module layout
+    return ((name, value) for name, value in list(vars(gta_native).items())
+            if isinstance(value, type) and value.__name__ == '_' + name.capitalize())
+
+
+def enable():
+    """
+    Start profiling native function calls. Does nothing if profiling
+    is already enabled.
+    """
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+        _profiler.install()
+
+
+def enable_from_environment():
+    """
+    Start profiling native function calls if the environment variable
+    has been set to a value that does not disable profiling.
+    """
+    if _environment_value() not in _disabled_values:
+        enable()
+
+
+def disable():
+    """
+    Stop profiling and restore the original native functions.
+    """
+    global _profiler
+    if _profiler is not None:
+        _profiler.uninstall()
+        _profiler = None
+
+
+def is_enabled():
+    """
+    Return whether native function calls are being profiled.
+    """
+    return _profiler is not None
+
+
+def get_stats():
+    """
+    Return a dict that maps qualified native function names to
+    :class:`NativeStats` instances or ``None`` if profiling is
+    disabled.
+    """
+    return _profiler.stats if _profiler is not None else None
+
+
+def dump(logger):
+    """
+    Write the report into the file the environment variable points to
+    or log it if the variable is not set to a path.
+
+    Arguments:
+        - `logger`: The logger the report will be logged to.
+    """
+    if _profiler is None:
+        return
+    lines = _profiler.report()
+    path = os.environ.get(environment_variable, '').strip()
+    if _environment_value() not in _enabled_values + _disabled_values:
+        with open(path, 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        logger.info('Native profile written to "{}"', path)
+    else:
+        for line in lines:
+            logger.info('{}', line)
+
+
+def _environment_value():
+    return os.environ.get(environment_variable, '').strip().lower()
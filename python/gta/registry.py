@@ -0,0 +1,256 @@
+"""
+Keep track of loaded scripts, so they can be started, stopped and
+restarted individually at runtime.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import time
+
+import gta
+
+from gta import shutdown
+from gta.exceptions import BadBehavingScriptError, UnknownScriptError
+from gta.tasks import ScriptTask
+
+__all__ = ('ScriptEntry', 'ScriptRegistry')
+
+
+class ScriptEntry:
+    """
+    A script that has been loaded.
+
+    Arguments:
+        - `name`: The name of the script.
+        - `module`: The module of the script.
+        - `metadata`: The metadata of the script.
+    """
+    def __init__(self, name, module, metadata):
+        self.name = name
+        self.module = module
+        self.metadata = metadata
+        self.task = None
+        self.started = None
+        self.restarts = 0
+
+    def __repr__(self):
+        return '<ScriptEntry name={}, running={}, restarts={}>'.format(
+            self.name, self.running, self.restarts)
+
+    @property
+    def running(self):
+        """
+        Return whether the task of the script has not finished.
+        """
+        return self.task is not None and not self.task.done()
+
+
+class ScriptRegistry:
+    """
+    Maps script names to :class:`ScriptEntry` instances and runs the
+    main function of each script as a :class:`gta.tasks.ScriptTask`.
+
+    Use :func:`gta.get_registry` to get the registry of the running
+    scripts.
+
+    The coroutines and methods of this class need to be called from
+    the event loop thread. Use :meth:`threadsafe` to run the coroutines
+    from another thread.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `load`: A coroutine function that will be called with the
+          name of a script and whether the script should be reloaded.
+          Needs to return a tuple of the module and the metadata of
+          the script or raise a :class:`ScriptError`.
+        - `done_callback`: A function that will be called with the
+          task of a script that is done and the name of the script as
+          keyword argument `name`.
+    """
+    def __init__(self, loop, load, done_callback=None):
+        self._loop = loop
+        self._load = load
+        self._done_callback = done_callback
+        self._entries = collections.OrderedDict()
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name):
+        """
+        Return the :class:`ScriptEntry` of a script.
+
+        Arguments:
+            - `name`: The name of the script.
+
+        Raise :class:`UnknownScriptError` if the script has not been
+        loaded.
+        """
+        try:
+            return self._entries[name]
+        except KeyError as exc:
+            raise UnknownScriptError(name) from exc
+
+    def list(self):
+        """
+        Return a list of all :class:`ScriptEntry` instances.
+        """
+        return list(self._entries.values())
+
+    def tasks(self):
+        """
+        Return a list of the current tasks of all scripts.
+        """
+        return [entry.task for entry in self.list() if entry.task is not None]
+
+    def add(self, name, module, metadata):
+        """
+        Register a script that has been loaded and start it. Replaces
+        the module and metadata if the script is already registered.
+
+        .. warning:: The script must not be running.
+
+        Arguments:
+            - `name`: The name of the script.
+            - `module`: The module of the script.
+            - `metadata`: The metadata of the script.
+
+        Return the :class:`ScriptEntry` of the script.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            entry = self._entries[name] = ScriptEntry(name, module, metadata)
+        else:
+            entry.module, entry.metadata = module, metadata
+        self._run(entry)
+        return entry
+
+    def remove(self, name):
+        """
+        Unregister a script that is not running.
+
+        Arguments:
+            - `name`: The name of the script.
+        """
+        entry = self.get(name)
+        if entry.running:
+            raise ValueError('Script "{}" is still running'.format(name))
+        del self._entries[name]
+
+    @asyncio.coroutine
+    def start(self, name, reload=False):
+        """
+        Start a script that is not running. The script will be loaded
+        if it has not been loaded before.
+
+        Arguments:
+            - `name`: The name of the script.
+            - `reload`: Reload the script before starting it.
+
+        Return the :class:`ScriptEntry` of the script.
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry.running:
+            return entry
+        if entry is None or reload:
+            module, metadata = yield from self._load(name, reload)
+            return self.add(name, module, metadata)
+        self._run(entry)
+        return entry
+
+    @asyncio.coroutine
+    def stop(self, name, timeout=1.0):
+        """
+        Cancel a script, wait until it has stopped and run its cleanup
+        hooks.
+
+        Arguments:
+            - `name`: The name of the script.
+            - `timeout`: The maximum amount of seconds to wait.
+
+        Return whether the script has stopped in time.
+        """
+        entry = self.get(name)
+        stopped = True
+        if entry.running:
+            entry.task.cancel()
+            done, pending = yield from asyncio.wait([entry.task], timeout=timeout)
+            stopped = len(pending) == 0
+        yield from shutdown.run([name])
+        return stopped
+
+    @asyncio.coroutine
+    def restart(self, name, reload=False, timeout=1.0):
+        """
+        Stop a script and start it again. Scripts that have not been
+        loaded before will be started.
+
+        Arguments:
+            - `name`: The name of the script.
+            - `reload`: Reload the script before starting it.
+            - `timeout`: The maximum amount of seconds to wait for the
+              script to stop.
+
+        Raise :class:`BadBehavingScriptError` if the script did not
+        stop in time.
+
+        Return the :class:`ScriptEntry` of the script.
+        """
+        entry = self._entries.get(name)
+        if entry is None:
+            return (yield from self.start(name, reload=reload))
+        if not (yield from self.stop(name, timeout=timeout)):
+            raise BadBehavingScriptError()
+        entry = yield from self.start(name, reload=reload)
+        entry.restarts += 1
+        return entry
+
+    def threadsafe(self, coro):
+        """
+        Run a coroutine of the registry from another thread.
+
+        Example::
+
+            future = registry.threadsafe(registry.stop('wanted'))
+            stopped = future.result(timeout=2.0)
+
+        Arguments:
+            - `coro`: A coroutine object, e.g. returned by
+              :meth:`stop`.
+
+        Return a :class:`concurrent.futures.Future` instance.
+        """
+        # Note: asyncio.run_coroutine_threadsafe requires Python 3.5.1
+        future = concurrent.futures.Future()
+
+        def _done(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def _schedule():
+            if future.set_running_or_notify_cancel():
+                self._loop.create_task(coro).add_done_callback(_done)
+
+        self._loop.call_soon_threadsafe(_schedule)
+        return future
+
+    def _run(self, entry):
+        logger = getattr(gta, '_utils').get_logger()
+        logger.info('Starting script "{}"', entry.name)
+        main = getattr(entry.module, 'main')
+        task = ScriptTask(main(), loop=self._loop, script=entry.name,
+                          priority=entry.metadata['priority'],
+                          slow_step_threshold=entry.metadata.get('slow_step_threshold'))
+        if self._done_callback is not None:
+            task.add_done_callback(functools.partial(self._done_callback, name=entry.name))
+        entry.task = task
+        entry.started = time.time()
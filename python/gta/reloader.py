@@ -0,0 +1,173 @@
+"""
+Watch the scripts directory and reload scripts that have changed
+without restarting the other scripts.
+
+Hot reloading is disabled by default. It can be enabled by setting the
+environment variable ``GTA_HOT_RELOAD`` before the game starts. If the
+value is a number, it will be used as the poll interval in seconds.
+"""
+import os
+import pkgutil
+import time
+
+__all__ = ('ReloadStats', 'ScriptWatcher', 'get_interval')
+
+environment_variable = 'GTA_HOT_RELOAD'
+
+# The amount of seconds between two scans of the scripts directory
+poll_interval = 1.0
+
+
+class ReloadStats:
+    """
+    Latencies between detecting a change and restarting the script.
+    """
+    def __init__(self):
+        self.reloads = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def __repr__(self):
+        mean = self.total_latency / self.reloads if self.reloads > 0 else 0.0
+        return '<ReloadStats reloads={}, failures={}, mean_latency={:.1f}ms, ' \
+               'max_latency={:.1f}ms>'.format(self.reloads, self.failures, mean * 1000,
+                                              self.max_latency * 1000)
+
+    def record(self, latency, success):
+        if not success:
+            self.failures += 1
+            return
+        self.reloads += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+
+class ScriptWatcher:
+    """
+    Poll the modification times and sizes of the scripts in a
+    directory and reload scripts that have been added, changed or
+    removed.
+
+    A script will not be reloaded again while it is being reloaded.
+    Changes that happen in the meantime will be picked up by the next
+    scan.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `path`: The path to the scripts directory.
+        - `reload`: A coroutine function that will be called with the
+          name of a script that needs to be reloaded. Should return
+          whether the script has been reloaded successfully.
+        - `interval`: The amount of seconds between two scans.
+    """
+    def __init__(self, loop, path, reload, interval=None):
+        self._loop = loop
+        self._path = path
+        self._reload = reload
+        self._snapshot = {}
+        self._reloading = {}
+        self._handle = None
+        self.interval = poll_interval if interval is None else interval
+        self.stats = ReloadStats()
+
+    def start(self):
+        """
+        Take a snapshot of the scripts and start polling.
+        """
+        self._snapshot = self.scan()
+        self._schedule()
+
+    def stop(self):
+        """
+        Stop polling and cancel pending reloads.
+        """
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        for task in self._reloading.values():
+            task.cancel()
+
+    def pending(self):
+        """
+        Return a list of the :class:`asyncio.Task` instances of
+        reloads that are in progress.
+        """
+        return list(self._reloading.values())
+
+    def scan(self):
+        """
+        Return a dict that maps the name of each script to the
+        modification times and sizes of its files.
+        """
+        snapshot = {}
+        # Note: Scripts are found the same way as on startup
+        for _, name, is_package in pkgutil.iter_modules([self._path]):
+            path = os.path.join(self._path, name)
+            try:
+                if is_package:
+                    snapshot[name] = self._scan_package(path)
+                else:
+                    stat = os.stat(path + '.py')
+                    snapshot[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                # Note: Removed in the meantime or not a source file
+                continue
+        return snapshot
+
+    def _scan_package(self, path):
+        signature = []
+        for directory, directories, files in os.walk(path):
+            directories[:] = [name for name in directories if name != '__pycache__']
+            for name in files:
+                if name.endswith('.py'):
+                    stat = os.stat(os.path.join(directory, name))
+                    signature.append((name, stat.st_mtime_ns, stat.st_size))
+        return tuple(sorted(signature))
+
+    def _schedule(self):
+        self._handle = self._loop.call_later(self.interval, self._poll)
+
+    def _poll(self):
+        snapshot = self.scan()
+        names = set(snapshot) | set(self._snapshot)
+        for name in sorted(names):
+            if snapshot.get(name) == self._snapshot.get(name):
+                continue
+            # Note: Keep the old state of scripts that are still being reloaded,
+            #       so the change will be detected again
+            if name in self._reloading:
+                snapshot[name] = self._snapshot.get(name)
+                if snapshot[name] is None:
+                    del snapshot[name]
+                continue
+            self._start_reload(name)
+        self._snapshot = snapshot
+        self._schedule()
+
+    def _start_reload(self, name):
+        start = time.perf_counter()
+        task = self._loop.create_task(self._reload(name))
+
+        def _done(task_):
+            del self._reloading[name]
+            success = not task_.cancelled() and task_.exception() is None and task_.result()
+            self.stats.record(time.perf_counter() - start, success)
+        task.add_done_callback(_done)
+        self._reloading[name] = task
+
+
+def get_interval():
+    """
+    Return the poll interval set by the environment variable or
+    ``None`` if hot reloading has not been enabled.
+    """
+    value = os.environ.get(environment_variable)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return poll_interval
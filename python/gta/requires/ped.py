@@ -1,9 +1,12 @@
-import gta_native
-
 from gta import exceptions
+from gta.cache import tick_cached, native
 
 __all__ = ('get_vehicle',)
 
+# Natives that only read game state
+_is_ped_in_any_vehicle = tick_cached(native('ped.is_ped_in_any_vehicle'))
+_get_vehicle_ped_is_using = tick_cached(native('ped.get_vehicle_ped_is_using'))
+
 
 def get_vehicle(ped):
     """
@@ -13,7 +16,7 @@ def get_vehicle(ped):
         - `ped`: The id of the ped.
     """
     # Check if the ped is in a vehicle
-    if gta_native.ped.is_ped_in_any_vehicle(ped, 0):
-        return gta_native.ped.get_vehicle_ped_is_using(ped)
+    if _is_ped_in_any_vehicle(ped, 0):
+        return _get_vehicle_ped_is_using(ped)
     else:
         raise exceptions.RequirementError('Vehicle of ped {}'.format(ped))
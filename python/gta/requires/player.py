@@ -1,10 +1,15 @@
-import gta_native
-
 from gta import exceptions
+from gta.cache import tick_cached, native
 from gta.requires import ped
 
 __all__ = ('get_id', 'get_ped', 'get_vehicle')
 
+# Natives that only read game state
+_player_id = tick_cached(native('player.player_id'))
+_player_ped_id = tick_cached(native('player.player_ped_id'))
+_does_entity_exist = tick_cached(native('entity.does_entity_exist'))
+
+
 def get_id(check_ped=True):
     """
     Return the player id.
@@ -15,7 +20,7 @@ def get_id(check_ped=True):
     """
     if check_ped:
         get_ped()
-    return gta_native.player.player_id()
+    return _player_id()
 
 
 def get_ped():
@@ -23,8 +28,8 @@ def get_ped():
     Return the player ped.
     """
     # Check if the player ped and entity exists
-    player_ped = gta_native.player.player_ped_id()
-    if gta_native.entity.does_entity_exist(player_ped):
+    player_ped = _player_ped_id()
+    if _does_entity_exist(player_ped):
         return player_ped
     else:
         raise exceptions.RequirementError('Player entity')
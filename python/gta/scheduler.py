@@ -0,0 +1,300 @@
+"""
+Limit the time scripts may spend in the event loop per game tick and
+run scripts with a higher priority first.
+
+The time budget is disabled by default. It can be enabled by setting
+the environment variable ``GTA_FRAME_BUDGET`` to the amount of seconds
+scripts may spend per tick before the game starts.
+"""
+import asyncio
+import collections
+import os
+import time
+
+from gta.enums import Priority
+
+__all__ = ('PriorityStats', 'FrameScheduler', 'get_budget')
+
+environment_variable = 'GTA_FRAME_BUDGET'
+
+# The amount of seconds scripts may spend per game tick or `None` for no limit
+frame_budget = None
+# The budget that will be used if the environment variable is not a number
+default_frame_budget = 0.005
+# Release deferred steps after this amount of seconds without a game tick
+frame_timeout = 0.1
+# A priority class with pending steps will be run after it has been passed
+# over this many times
+starvation_limit = 16
+# A priority class with pending steps will be run at least once within this
+# amount of ticks, even if the time budget has been used up
+starvation_ticks = 4
+
+
+class PriorityStats:
+    """
+    Latencies between queueing and running steps of a priority class.
+    """
+    def __init__(self):
+        self.steps = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.starved = 0
+
+    def __repr__(self):
+        mean = self.total_latency / self.steps if self.steps > 0 else 0.0
+        return ('<PriorityStats steps={}, mean_latency={:.2f}ms, max_latency={:.2f}ms, '
+                'starved={}>').format(self.steps, mean * 1000, self.max_latency * 1000,
+                                      self.starved)
+
+    def record(self, latency):
+        self.steps += 1
+        self.total_latency += latency
+        if latency > self.max_latency:
+            self.max_latency = latency
+
+
+class FrameScheduler:
+    """
+    Run the steps of script tasks in a fair round-robin order across
+    scripts until the time budget of the current game tick has been
+    used up. Remaining steps will be deferred to the next tick.
+
+    Steps of a higher :class:`Priority` class are run first. To avoid
+    starvation, a lower class with pending steps will be run once it
+    has been passed over :data:`starvation_limit` times. A class that
+    did not run a step for :data:`starvation_ticks` ticks will run one
+    step even if the budget has been used up. Steps of the `realtime`
+    class are not charged to the time budget. They have a separate
+    budget per tick instead, so a busy realtime script cannot block
+    the other scripts.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `budget`: The amount of seconds scripts may spend per tick.
+          Defaults to :func:`get_budget`.
+        - `realtime_budget`: The amount of seconds realtime scripts
+          may spend per tick. Defaults to `budget`.
+        - `timeout`: Release deferred steps after this amount of
+          seconds even if no game tick occurred.
+    """
+    def __init__(self, loop, budget=None, timeout=None, realtime_budget=None):
+        self._loop = loop
+        self._queues = {priority: collections.OrderedDict() for priority in Priority}
+        self._passed = {priority: 0 for priority in Priority}
+        self._waited = {priority: 0 for priority in Priority}
+        self._stats = {priority: PriorityStats() for priority in Priority}
+        self._spent = 0.0
+        self._realtime_spent = 0.0
+        self._step_start = None
+        self._step_priority = None
+        self._dispatch_scheduled = False
+        self._waiting = False
+        self._timeout_handle = None
+        self._frame_waiters = []
+        self.budget = get_budget() if budget is None else budget
+        self.realtime_budget = self.budget if realtime_budget is None else realtime_budget
+        self.timeout = frame_timeout if timeout is None else timeout
+        self.enabled = True
+        self.deferred = 0
+
+    def __len__(self):
+        """
+        Return the amount of steps that are waiting to be run.
+        """
+        return sum((len(queue) for queues in self._queues.values()
+                    for queue in queues.values()))
+
+    def over_budget(self):
+        """
+        Return whether the time budget of the current tick has been
+        used up. Includes the time of the step that is currently
+        running.
+        """
+        if not self.enabled or self.budget is None:
+            return False
+        spent = self._spent
+        if self._step_start is not None and self._step_priority is not Priority.realtime:
+            spent += time.perf_counter() - self._step_start
+        return spent > self.budget
+
+    def submit(self, task, args):
+        """
+        Queue a step of a script task.
+
+        Arguments:
+            - `task`: The :class:`gta.tasks.ScriptTask` instance.
+            - `args`: The arguments that will be passed to the step.
+        """
+        queues = self._queues[task.priority]
+        queue = queues.get(task.script)
+        if queue is None:
+            queue = queues[task.script] = collections.deque()
+        queue.append((task, args, time.perf_counter()))
+        self._schedule()
+
+    def get_stats(self):
+        """
+        Return a dict that maps each :class:`Priority` class to a
+        :class:`PriorityStats` instance.
+        """
+        return dict(self._stats)
+
+    def tick(self):
+        """
+        Start a new tick with a fresh time budget and release deferred
+        steps.
+
+        .. warning:: Must be called from within the event loop.
+        """
+        self._spent = 0.0
+        self._realtime_spent = 0.0
+        self._waiting = False
+        # Count the ticks each class with pending steps did not run a step
+        for priority, queues in self._queues.items():
+            if len(queues) > 0:
+                self._waited[priority] += 1
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+
+        # Wake up scripts that waited for the next tick
+        waiters, self._frame_waiters = self._frame_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._schedule()
+
+    def next_frame(self):
+        """
+        Return a :class:`asyncio.Future` instance that will be resolved
+        once a new tick has started.
+        """
+        future = asyncio.Future(loop=self._loop)
+        self._frame_waiters.append(future)
+        self._arm_timeout()
+        return future
+
+    def disable(self):
+        """
+        Stop enforcing the time budget and run all deferred steps.
+        """
+        self.enabled = False
+        self.tick()
+
+    def _schedule(self):
+        if self._dispatch_scheduled:
+            return
+        # Note: Realtime steps are run even when waiting for the next tick
+        if self._waiting and not (len(self._queues[Priority.realtime]) > 0
+                                  and self._realtime_allowed()):
+            return
+        if any((len(queues) > 0 for queues in self._queues.values())):
+            self._dispatch_scheduled = True
+            self._loop.call_soon(self._dispatch)
+
+    def _arm_timeout(self):
+        if self._timeout_handle is None:
+            self._timeout_handle = self._loop.call_later(self.timeout, self.tick)
+
+    def _realtime_allowed(self):
+        """
+        Return whether realtime steps may be run in the current tick.
+        """
+        if not self.enabled or self.realtime_budget is None:
+            return True
+        return self._realtime_spent <= self.realtime_budget
+
+    def _next_priority(self, over_budget):
+        """
+        Return the priority class the next step will be taken from or
+        ``None`` if no step may be run.
+        """
+        # Pending classes ordered from highest to lowest priority
+        pending = [priority for priority in Priority if len(self._queues[priority]) > 0]
+        if len(pending) == 0:
+            return None
+        realtime = Priority.realtime in pending and self._realtime_allowed()
+
+        # Run a step of a class that has been waiting for too many ticks
+        if over_budget:
+            for priority in pending:
+                if self._waited[priority] >= starvation_ticks:
+                    self._stats[priority].starved += 1
+                    return priority
+            return Priority.realtime if realtime else None
+
+        # Note: Realtime steps that used up their budget wait for the next tick
+        if not realtime and Priority.realtime in pending:
+            pending.remove(Priority.realtime)
+            if len(pending) == 0:
+                return None
+
+        # Run a starving class or the highest class
+        chosen = pending[0]
+        for priority in pending[1:]:
+            if self._passed[priority] >= starvation_limit:
+                self._stats[priority].starved += 1
+                chosen = priority
+                break
+
+        # Update how often the other pending classes have been passed over
+        for priority in pending:
+            self._passed[priority] = 0 if priority is chosen else self._passed[priority] + 1
+        return chosen
+
+    def _dispatch(self):
+        self._dispatch_scheduled = False
+        # Note: Steps queued while dispatching are run after other callbacks of the
+        #       loop, so scripts that yield continuously cannot block the loop
+        for _ in range(len(self)):
+            over_budget = self.over_budget()
+            priority = self._next_priority(over_budget)
+            if priority is None:
+                # Defer the remaining steps to the next tick
+                if len(self) > 0 and not self._waiting:
+                    self.deferred += len(self)
+                    self._waiting = True
+                    self._arm_timeout()
+                return
+
+            # Take one step from the first script and rotate it to the end
+            queues = self._queues[priority]
+            script, queue = next(iter(queues.items()))
+            task, args, queued = queue.popleft()
+            if len(queue) > 0:
+                queues.move_to_end(script)
+            else:
+                del queues[script]
+
+            # Run step
+            self._waited[priority] = 0
+            self._step_start = time.perf_counter()
+            self._step_priority = priority
+            self._stats[priority].record(self._step_start - queued)
+            try:
+                task.run_step(*args)
+            finally:
+                duration = time.perf_counter() - self._step_start
+                if priority is Priority.realtime:
+                    self._realtime_spent += duration
+                else:
+                    self._spent += duration
+                self._step_start = None
+                self._step_priority = None
+        self._schedule()
+
+
+def get_budget():
+    """
+    Return the time budget per tick set by the environment variable or
+    :data:`frame_budget` if the variable has not been set.
+    """
+    value = os.environ.get(environment_variable)
+    if not value:
+        return frame_budget
+    try:
+        return float(value)
+    except ValueError:
+        return default_frame_budget
@@ -0,0 +1,137 @@
+"""
+Let scripts register cleanup coroutines that will be run when the
+script is stopped, e.g. to flush data to a file or upload it.
+
+Example::
+
+    @asyncio.coroutine
+    def upload_stats():
+        yield from session.post(url, data=stats)
+
+    gta.shutdown.register(upload_stats, deadline=3.0)
+
+The cleanup hooks of all scripts are run concurrently. A hook that
+does not finish within its deadline will be cancelled.
+"""
+import asyncio
+import functools
+
+import gta
+
+from gta.exceptions import ScriptError
+
+__all__ = ('register', 'unregister', 'get_deadline', 'run')
+
+# The amount of seconds a cleanup hook may take if it did not declare a deadline
+default_deadline = 1.0
+# The maximum amount of seconds a cleanup hook may take
+max_deadline = 10.0
+
+_hooks = {}
+# Maps hooks that are being run to their deadline
+_running = {}
+
+
+def _current_script():
+    loop = getattr(gta, '_loop')
+    task = asyncio.Task.current_task(loop=loop) if loop is not None else None
+    script = getattr(task, 'script', None)
+    if script is None:
+        raise ScriptError('Cleanup hooks can only be registered from within a script')
+    return script
+
+
+def register(hook, deadline=None):
+    """
+    Register a cleanup hook for the script that is currently running.
+
+    Arguments:
+        - `hook`: A coroutine function that will be called without
+          arguments when the script is stopped.
+        - `deadline`: The maximum amount of seconds the hook may take.
+          Will be limited to :data:`max_deadline`.
+    """
+    deadline = default_deadline if deadline is None else min(deadline, max_deadline)
+    _hooks.setdefault(_current_script(), []).append((hook, deadline))
+
+
+def unregister(hook):
+    """
+    Remove a cleanup hook of the script that is currently running.
+
+    Arguments:
+        - `hook`: The coroutine function that has been registered.
+    """
+    script = _current_script()
+    hooks = [(hook_, deadline) for hook_, deadline in _hooks.get(script, ()) if hook_ != hook]
+    if len(hooks) > 0:
+        _hooks[script] = hooks
+    else:
+        _hooks.pop(script, None)
+
+
+def get_deadline():
+    """
+    Return the longest deadline of all cleanup hooks that are
+    registered or being run or ``0.0`` if there are none.
+    """
+    # Note: Hooks are removed from the registered hooks once they are being run
+    deadlines = [deadline for hooks in list(_hooks.values()) for _, deadline in hooks]
+    deadlines += list(_running.values())
+    return max(deadlines, default=0.0)
+
+
+@asyncio.coroutine
+def run(names=None):
+    """
+    Run the cleanup hooks of scripts concurrently and remove them.
+
+    .. warning:: Do not call this function from a script!
+
+    Arguments:
+        - `names`: The names of the scripts whose hooks will be run.
+          Defaults to all scripts.
+
+    Return a dict that maps script names to the amount of seconds
+    their hooks took.
+    """
+    loop = getattr(gta, '_loop')
+    logger = getattr(gta, '_utils').get_logger()
+    names = list(_hooks) if names is None else [name for name in names if name in _hooks]
+    start = loop.time()
+    durations = {}
+
+    def _done(name, deadline, future):
+        _running.pop(future, None)
+        durations[name] = max(durations.get(name, 0.0), loop.time() - start)
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if isinstance(exc, asyncio.TimeoutError):
+            message = 'Cleanup hook of script "{}" exceeded its deadline of {} seconds'
+            logger.warning(message, name, deadline)
+        elif exc is not None:
+            logger.error('Cleanup hook of script "{}" failed: {!r}', name, exc)
+
+    # Start all hooks at once
+    jobs = []
+    for name in names:
+        for hook, deadline in _hooks[name]:
+            # Note: A hook that raises immediately must not skip the other hooks
+            try:
+                job = loop.create_task(asyncio.wait_for(hook(), deadline))
+            except Exception as exc:
+                durations.setdefault(name, 0.0)
+                logger.error('Cleanup hook of script "{}" failed: {!r}', name, exc)
+                continue
+            _running[job] = deadline
+            job.add_done_callback(functools.partial(_done, name, deadline))
+            jobs.append(job)
+        # Note: Removed after the hooks are marked as running, so the deadline
+        #       is never missing for another thread
+        del _hooks[name]
+
+    # Note: Each hook is limited by its own deadline
+    if len(jobs) > 0:
+        yield from asyncio.wait(jobs)
+    return durations
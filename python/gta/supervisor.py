@@ -0,0 +1,134 @@
+"""
+Restart scripts that crashed if they opted in via their metadata::
+
+    __restart__ = True
+
+Restarts are delayed with an exponential backoff. A script that keeps
+crashing will not be restarted anymore once it crashed
+:data:`max_restarts` times within :data:`restart_window` seconds.
+"""
+import asyncio
+import collections
+
+import gta
+
+__all__ = ('CrashStats', 'ScriptSupervisor')
+
+# The amount of seconds to wait before restarting a script that crashed once
+backoff_initial = 1.0
+# The maximum amount of seconds to wait before restarting a script
+backoff_max = 60.0
+# Scripts that crashed more often within the window will not be restarted
+max_restarts = 5
+# The amount of seconds crashes will be counted for
+restart_window = 300.0
+
+
+class CrashStats:
+    """
+    Crashes and automatic restarts of a script.
+    """
+    def __init__(self):
+        self.crashes = 0
+        self.restarts = 0
+        self.given_up = False
+        self.recent = collections.deque()
+
+    def __repr__(self):
+        return '<CrashStats crashes={}, restarts={}, given_up={}>'.format(
+            self.crashes, self.restarts, self.given_up)
+
+
+class ScriptSupervisor:
+    """
+    Restart scripts that opted in after they raised an exception.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `registry`: The :class:`gta.registry.ScriptRegistry` the
+          scripts are registered in.
+    """
+    def __init__(self, loop, registry):
+        self._loop = loop
+        self._registry = registry
+        self._stats = {}
+        self._restarts = {}
+        self.enabled = True
+
+    def get_stats(self):
+        """
+        Return a dict that maps the names of scripts that crashed to
+        :class:`CrashStats` instances.
+        """
+        return dict(self._stats)
+
+    def pending(self):
+        """
+        Return a list of the :class:`asyncio.Task` instances of
+        restarts that are pending.
+        """
+        return list(self._restarts.values())
+
+    def stop(self):
+        """
+        Cancel pending restarts and stop restarting scripts.
+        """
+        self.enabled = False
+        for restart in self._restarts.values():
+            restart.cancel()
+
+    def script_done(self, task, name):
+        """
+        Schedule a restart if the task of a script crashed and the
+        script opted in.
+
+        Arguments:
+            - `task`: The :class:`asyncio.Task` instance of the script.
+            - `name`: The name of the script.
+        """
+        if task.cancelled() or task.exception() is None:
+            return
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = CrashStats()
+        stats.crashes += 1
+        if not self.enabled or name not in self._registry:
+            return
+        entry = self._registry.get(name)
+        if not entry.metadata.get('restart', False) or entry.task is not task:
+            return
+
+        # Forget crashes that happened before the window
+        now = self._loop.time()
+        stats.recent.append(now)
+        while stats.recent[0] < now - restart_window:
+            stats.recent.popleft()
+
+        logger = getattr(gta, '_utils').get_logger()
+        if len(stats.recent) > max_restarts:
+            stats.given_up = True
+            message = 'Script "{}" crashed {} times within {} seconds, not restarting'
+            logger.error(message, name, len(stats.recent), restart_window)
+            return
+
+        # Double the delay for each recent crash
+        delay = min(backoff_initial * 2 ** (len(stats.recent) - 1), backoff_max)
+        logger.info('Restarting script "{}" in {:.1f} seconds', name, delay)
+        restart = self._loop.create_task(self._restart(name, task, delay))
+        restart.add_done_callback(lambda _: self._restarts.pop(name, None))
+        self._restarts[name] = restart
+
+    @asyncio.coroutine
+    def _restart(self, name, task, delay):
+        yield from asyncio.sleep(delay)
+
+        # Note: The script may have been started or removed in the meantime
+        if name not in self._registry or self._registry.get(name).task is not task:
+            return
+        self._stats[name].restarts += 1
+        try:
+            yield from self._registry.restart(name)
+        except gta.ScriptError as exc:
+            logger = getattr(gta, '_utils').get_logger()
+            logger.error('Restarting script "{}" failed: {}', name, exc)
@@ -0,0 +1,208 @@
+"""
+Tasks that account the time each script spends in the event loop.
+"""
+import asyncio
+import ctypes
+import os
+import time
+
+import gta
+
+from gta.enums import Priority
+
+__all__ = ('ScriptStats', 'ScriptTask', 'task_factory', 'get_stats', 'reset_stats')
+
+# Steps that take longer than this amount of seconds will be logged unless
+# the script sets `__slow_step_threshold__` in its metadata
+default_slow_step_threshold = 0.05
+
+_asyncio_path = os.path.dirname(asyncio.__file__)
+_stats = {}
+
+
+def _get_thread_cpu_time():
+    """
+    Return a function that returns the CPU time of the calling thread
+    in seconds or ``None`` if it can not be measured.
+    """
+    # Note: Available since Python 3.7
+    if hasattr(time, 'thread_time'):
+        return time.thread_time
+    if os.name == 'nt':
+        import ctypes.wintypes
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentThread.restype = ctypes.wintypes.HANDLE
+        kernel32.GetThreadTimes.argtypes = (ctypes.wintypes.HANDLE,) + (
+            ctypes.POINTER(ctypes.c_ulonglong),) * 4
+        # Note: A pseudo handle that always refers to the calling thread
+        thread = kernel32.GetCurrentThread()
+        creation, exit_, kernel, user = (ctypes.c_ulonglong() for _ in range(4))
+
+        def thread_cpu_time():
+            kernel32.GetThreadTimes(thread, ctypes.byref(creation), ctypes.byref(exit_),
+                                    ctypes.byref(kernel), ctypes.byref(user))
+            # Note: The times are given in 100 nanosecond intervals
+            return (kernel.value + user.value) / 10000000
+        return thread_cpu_time
+    if hasattr(time, 'CLOCK_THREAD_CPUTIME_ID'):
+        return lambda: time.clock_gettime(time.CLOCK_THREAD_CPUTIME_ID)
+    return None
+
+# Note: The CPU time of the process would include the threads of the game
+_cpu_time = _get_thread_cpu_time()
+
+
+class ScriptStats:
+    """
+    Time a script spent executing steps of its tasks.
+
+    The CPU time is ``None`` if the CPU time of a thread can not be
+    measured on this platform.
+    """
+    def __init__(self):
+        self.steps = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0 if _cpu_time is not None else None
+        self.max_step = 0.0
+        self.slow_steps = 0
+
+    def __repr__(self):
+        cpu_time = '{:.3f}s'.format(self.cpu_time) if self.cpu_time is not None else 'n/a'
+        return ('<ScriptStats steps={}, wall_time={:.3f}s, cpu_time={}, '
+                'max_step={:.1f}ms, slow_steps={}>').format(
+            self.steps, self.wall_time, cpu_time, self.max_step * 1000, self.slow_steps)
+
+    def record(self, wall_time, cpu_time):
+        self.steps += 1
+        self.wall_time += wall_time
+        if cpu_time is not None:
+            self.cpu_time += cpu_time
+        if wall_time > self.max_step:
+            self.max_step = wall_time
+
+
+class ScriptTask(asyncio.Task):
+    """
+    A task that belongs to a script and accounts the time of each of
+    its steps to that script.
+
+    Arguments:
+        - `coro`: The coroutine that will be wrapped.
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `script`: The name of the script or ``None`` if the task
+          does not belong to a script.
+        - `priority`: The :class:`Priority` class of the script.
+        - `slow_step_threshold`: Steps that take longer than this
+          amount of seconds will be logged. Defaults to
+          :data:`default_slow_step_threshold`.
+    """
+    def __init__(self, coro, *, loop=None, script=None, priority=Priority.normal,
+                 slow_step_threshold=None):
+        super().__init__(coro, loop=loop)
+        self.script = script
+        self.priority = priority
+        if slow_step_threshold is None:
+            slow_step_threshold = default_slow_step_threshold
+        self.slow_step_threshold = slow_step_threshold
+
+    def _step(self, *args):
+        if self.script is None:
+            return super()._step(*args)
+
+        # Let the frame scheduler decide when the step will be run
+        scheduler = getattr(gta, '_frame_scheduler', None)
+        if scheduler is None:
+            return self.run_step(*args)
+        scheduler.submit(self, args)
+
+    def run_step(self, *args):
+        """
+        Run a step of the task and account its time to the script.
+
+        .. warning:: Do not call this method from a script!
+        """
+        cpu_time = _cpu_time() if _cpu_time is not None else None
+        wall_time = time.perf_counter()
+        try:
+            return super()._step(*args)
+        finally:
+            wall_time = time.perf_counter() - wall_time
+            if cpu_time is not None:
+                cpu_time = _cpu_time() - cpu_time
+            stats = _stats.get(self.script)
+            if stats is None:
+                stats = _stats[self.script] = ScriptStats()
+            stats.record(wall_time, cpu_time)
+            if wall_time > self.slow_step_threshold:
+                stats.slow_steps += 1
+                self._report_slow_step(wall_time)
+
+    def _report_slow_step(self, wall_time):
+        logger = getattr(gta, '_utils').get_logger('gta.tasks')
+
+        # Find the line the coroutine is suspended at
+        frame = _innermost_frame(self._coro)
+        if frame is not None:
+            location = '{}:{} in {}'.format(
+                frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+        else:
+            location = 'task finished'
+
+        message = 'Script "{}" step took {:.1f} ms (threshold {:.1f} ms), suspended at: {}'
+        logger.warning(message, self.script, wall_time * 1000,
+                       self.slow_step_threshold * 1000, location)
+
+
+def _innermost_frame(coro):
+    """
+    Return the frame of the innermost coroutine a coroutine is awaiting
+    or ``None`` if the coroutine finished. Frames of :mod:`asyncio`
+    itself (e.g. :func:`asyncio.sleep`) are skipped, so the frame
+    points at the code of the script.
+
+    Arguments:
+        - `coro`: A coroutine or generator based coroutine.
+    """
+    innermost = None
+    while coro is not None:
+        # Note: Generator based coroutines use `gi_*` instead of `cr_*` attributes
+        frame = getattr(coro, 'cr_frame', getattr(coro, 'gi_frame', None))
+        if frame is None:
+            break
+        if innermost is None or not frame.f_code.co_filename.startswith(_asyncio_path):
+            innermost = frame
+        coro = getattr(coro, 'cr_await', getattr(coro, 'gi_yieldfrom', None))
+    return innermost
+
+
+def task_factory(loop, coro):
+    """
+    Create a :class:`ScriptTask` that belongs to the same script and
+    priority class and has the same slow step threshold as the task
+    that is currently running.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` that is being
+          used.
+        - `coro`: The coroutine that will be wrapped.
+    """
+    parent = asyncio.Task.current_task(loop=loop)
+    return ScriptTask(coro, loop=loop, script=getattr(parent, 'script', None),
+                      priority=getattr(parent, 'priority', Priority.normal),
+                      slow_step_threshold=getattr(parent, 'slow_step_threshold', None))
+
+
+def get_stats():
+    """
+    Return a dict that maps script names to :class:`ScriptStats`
+    instances.
+    """
+    return dict(_stats)
+
+
+def reset_stats():
+    """
+    Remove the statistics of all scripts.
+    """
+    _stats.clear()
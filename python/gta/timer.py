@@ -0,0 +1,146 @@
+"""
+A tick based scheduler for futures that need to be resolved after a
+specific amount of game ticks.
+"""
+import asyncio
+
+__all__ = ('TickWheel',)
+
+
+class TickWheel:
+    """
+    A hierarchical timer wheel keyed by absolute tick numbers.
+
+    Each level consists of ``2 ** bits`` slots. Entries of level `n`
+    expire within ``2 ** (bits * (n + 1))`` ticks and will be cascaded
+    down to a lower level once the wheel reaches their slot. Entries
+    that expire beyond the range of the highest level are stored in an
+    overflow list which will be checked whenever the highest level
+    wraps around.
+
+    Arguments:
+        - `loop`: The :class:`asyncio.BaseEventLoop` the futures will
+          be assigned to.
+        - `current`: The current tick number.
+        - `bits`: The amount of bits used for the slots of a level.
+        - `levels`: The amount of levels.
+    """
+    def __init__(self, loop, current=0, bits=6, levels=4):
+        self._loop = loop
+        self._current = current
+        self._bits = bits
+        self._mask = (1 << bits) - 1
+        self._range = 1 << (bits * levels)
+        self._levels = [[[] for _ in range(1 << bits)] for _ in range(levels)]
+        self._overflow = []
+        self._length = 0
+
+    def __len__(self):
+        """
+        Return the amount of scheduled entries. Includes entries whose
+        futures have been cancelled but not yet expired.
+        """
+        return self._length
+
+    @property
+    def current(self):
+        """
+        Return the current tick number.
+        """
+        return self._current
+
+    def wait(self, count):
+        """
+        Schedule a future that will be resolved after a specific amount
+        of ticks.
+
+        Arguments:
+            - `count`: The amount of ticks to wait for.
+
+        Return a :class:`asyncio.Future` instance that will be resolved
+        with the tick number it expired on.
+        """
+        future = asyncio.Future(loop=self._loop)
+        if count <= 0:
+            future.set_result(self._current)
+        else:
+            self._insert(self._current + count, future)
+            self._length += 1
+        return future
+
+    def advance(self, tick):
+        """
+        Advance the wheel and resolve all expired futures.
+
+        Arguments:
+            - `tick`: The tick number to advance to.
+        """
+        while self._current < tick:
+            if self._length == 0:
+                # Nothing has been scheduled, so we can skip ahead
+                self._current = tick
+                break
+            self._current += 1
+            self._cascade()
+            self._expire()
+
+    def clear(self):
+        """
+        Cancel all scheduled futures and remove them from the wheel.
+        """
+        entries = self._overflow
+        for level in self._levels:
+            for slot in level:
+                entries.extend(slot)
+                slot.clear()
+        for _, future in entries:
+            future.cancel()
+        self._overflow = []
+        self._length = 0
+
+    def _insert(self, tick, future):
+        delta = tick - self._current
+
+        # Too far in the future for the wheel
+        if delta >= self._range:
+            self._overflow.append((tick, future))
+            return
+
+        # Find the lowest level that covers the delta
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        slot = (tick >> (self._bits * level)) & self._mask
+        self._levels[level][slot].append((tick, future))
+
+    def _cascade(self):
+        current = self._current
+
+        # Reinsert overflow entries when the highest level wraps around
+        if current & (self._range - 1) == 0 and len(self._overflow) > 0:
+            entries, self._overflow = self._overflow, []
+            for entry in entries:
+                self._insert(*entry)
+
+        # Cascade from the highest level that reached a new slot downwards
+        for level in range(len(self._levels) - 1, 0, -1):
+            shift = self._bits * level
+            if current & ((1 << shift) - 1) == 0:
+                slot = (current >> shift) & self._mask
+                entries = self._levels[level][slot]
+                if len(entries) > 0:
+                    self._levels[level][slot] = []
+                    for entry in entries:
+                        self._insert(*entry)
+
+    def _expire(self):
+        slot = self._current & self._mask
+        entries = self._levels[0][slot]
+        if len(entries) > 0:
+            self._levels[0][slot] = []
+            self._length -= len(entries)
+            for tick, future in entries:
+                # Note: Futures of cancelled waiters remain in the wheel until
+                #       they expire
+                if not future.done():
+                    future.set_result(tick)
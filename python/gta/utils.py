@@ -1,13 +1,51 @@
+import asyncio
+import collections
+import glob
+import gzip
+import hashlib
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import traceback
 import pip.commands
 import pip.exceptions
 import pkg_resources
 
+import gta
+
 from gta.exceptions import *
 
-__all__ = ('Message', 'CurlyBracketFormattingAdapter', 'get_directory', 'setup_logging',
-           'get_logger', 'install_dependency')
+__all__ = ('Message', 'CurlyBracketFormattingAdapter', 'BatchStreamMixin',
+           'BatchStreamHandler', 'BatchFileHandler', 'RotatingBatchFileHandler',
+           'DroppingQueueHandler', 'LogWriter', 'ContextFilter', 'JsonLinesFormatter',
+           'get_directory', 'setup_logging', 'stop_logging', 'get_logger', 'update_levels',
+           'install_dependency', 'install_dependencies')
+
+# The maximum amount of log records waiting to be written
+log_queue_size = 10000
+# The maximum amount of log records that will be written at once
+log_batch_size = 256
+
+# Start a new log file once the current one exceeds this amount of bytes
+log_max_bytes = 16 * 1024 * 1024
+# Start a new log file once the current one is older than this amount of seconds
+log_max_age = 24 * 60 * 60
+# The maximum amount of rotated log files that will be kept
+log_backup_count = 10
+# Rotated log files older than this amount of seconds will be removed
+log_retention = 7 * 24 * 60 * 60
+# Write a structured log file as well if this environment variable is set
+structured_log_variable = 'GTA_STRUCTURED_LOG'
+
+_log_handlers = []
+_log_writer = None
+_adapters = {}
 
 
 class Message:
@@ -26,22 +64,38 @@ class Message:
         - `args`: Arguments that will be passed to the formatter.
     """
 
+    __slots__ = ('_fmt', '_args')
+
     def __init__(self, fmt, args):
         """Create a message instance with formatter and arguments."""
         self._fmt = fmt
         self._args = args
 
+    @property
+    def fmt(self):
+        """The unformatted message."""
+        return self._fmt
+
+    @property
+    def args(self):
+        """The arguments that will be passed to the formatter."""
+        return self._args
+
     def __str__(self):
         """
         Return a formatted string using curly brackets.
 
         The __str__ method will be called if :attr:`_fmt` is not a
-        string.
+        string. Strings without replacement fields will not be
+        formatted.
         """
-        if isinstance(self._fmt, str):
-            return self._fmt.format(*self._args)
+        fmt = self._fmt
+        if isinstance(fmt, str):
+            if '{' in fmt or '}' in fmt:
+                return fmt.format(*self._args)
+            return fmt
         else:
-            return self._fmt.__str__()
+            return fmt.__str__()
 
 
 class CurlyBracketFormattingAdapter(logging.LoggerAdapter):
@@ -49,6 +103,12 @@ class CurlyBracketFormattingAdapter(logging.LoggerAdapter):
     A logging style adapter that is able to use the new curly bracket
     formatting style.
 
+    Check :attr:`debug_enabled` before building expensive arguments
+    of debug messages::
+
+        if logger.debug_enabled:
+            logger.debug('State: {}', describe(state))
+
     Arguments:
         - `logger`: Instance of :class:`logging.Logger`.
         - `extra`: Optional dict-like object that will be passed to
@@ -56,6 +116,22 @@ class CurlyBracketFormattingAdapter(logging.LoggerAdapter):
     """
     def __init__(self, logger, extra=None):
         super().__init__(logger, extra or {})
+        self.debug_enabled = False
+        self.update_levels()
+
+    def update_levels(self):
+        """
+        Update :attr:`debug_enabled`. Needs to be called after the
+        level of the logger or one of its parents has been changed.
+        """
+        self.debug_enabled = self.isEnabledFor(logging.DEBUG)
+
+    def debug(self, msg, *args, **kwargs):
+        """
+        Pass a debug message unless debug messages are disabled.
+        """
+        if self.debug_enabled:
+            self.log(logging.DEBUG, msg, *args, **kwargs)
 
     def log(self, level, msg, *args, **kwargs):
         """
@@ -68,18 +144,416 @@ class CurlyBracketFormattingAdapter(logging.LoggerAdapter):
             self.logger._log(level, Message(msg, args), (), **kwargs)
 
 
+class BatchStreamMixin:
+    """
+    Adds a method to stream handlers that writes multiple log records
+    and flushes the stream once.
+    """
+    def handle_batch(self, records):
+        """
+        Write log records that passed the level and filters of the
+        handler.
+
+        Arguments:
+            - `records`: An iterable of :class:`logging.LogRecord`
+              instances.
+        """
+        self.acquire()
+        try:
+            for record in records:
+                if record.levelno < self.level or not self.filter(record):
+                    continue
+                try:
+                    self.stream.write(self.format(record) + self.terminator)
+                except Exception:
+                    self.handleError(record)
+            self.flush()
+        finally:
+            self.release()
+
+
+class BatchStreamHandler(BatchStreamMixin, logging.StreamHandler):
+    pass
+
+
+class BatchFileHandler(BatchStreamMixin, logging.FileHandler):
+    pass
+
+
+class RotatingBatchFileHandler(BatchFileHandler):
+    """
+    A file handler that starts a new log file once the current one
+    exceeds a size or an age. Rotated files are named after the time of
+    the rotation, compressed and removed after the retention period in
+    a background thread.
+
+    Arguments:
+        - `filename`: The path to the log file.
+        - `max_bytes`: The maximum size of a log file in bytes or
+          ``None`` for no limit.
+        - `max_age`: The maximum age of a log file in seconds or
+          ``None`` for no limit.
+        - `backup_count`: The maximum amount of rotated files or
+          ``None`` for no limit.
+        - `retention`: Rotated files older than this amount of seconds
+          will be removed. ``None`` keeps them.
+        - `compress`: Compress rotated files using gzip.
+    """
+    # Seconds to wait before trying again after a log file could not be rotated
+    retry_delay = 60.0
+
+    def __init__(self, filename, max_bytes=None, max_age=None, backup_count=None,
+                 retention=None, compress=True):
+        super().__init__(filename)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.backup_count = backup_count
+        self.retention = retention
+        self.compress = compress
+        self._opened = self._creation_time()
+        self._retry = None
+        self._worker = None
+        # Start with a new file if the existing one is too old or too large
+        self._try_rollover()
+
+    def emit(self, record):
+        super().emit(record)
+        self._try_rollover()
+
+    def handle_batch(self, records):
+        super().handle_batch(records)
+        self.acquire()
+        try:
+            self._try_rollover()
+        finally:
+            self.release()
+
+    def close(self):
+        super().close()
+        # Note: Wait for a pending compression, so no partial archive is left behind
+        if self._worker is not None:
+            self._worker.join()
+
+    def _creation_time(self):
+        # Note: The age of an existing log file counts from its creation
+        try:
+            stat = os.stat(self.baseFilename)
+        except OSError:
+            return time.time()
+        # Note: `st_ctime` is the creation time on Windows only
+        return min(stat.st_ctime, stat.st_mtime)
+
+    def _should_rollover(self):
+        if self.stream is None:
+            return False
+        if self._retry is not None and time.time() < self._retry:
+            return False
+        if self.max_bytes is not None and self.stream.tell() >= self.max_bytes:
+            return True
+        return self.max_age is not None and time.time() - self._opened >= self.max_age
+
+    def _try_rollover(self):
+        try:
+            if self._should_rollover():
+                self._rollover()
+        except Exception:
+            # Note: The file may be opened by another process on Windows, keep
+            #       writing into the current file and try again later
+            self._retry = time.time() + self.retry_delay
+            self.handleError(logging.makeLogRecord({
+                'msg': 'Could not rotate log file "{}"'.format(self.baseFilename),
+            }))
+
+    def _rollover(self):
+        self.stream.close()
+        self.stream = None
+
+        # Name the rotated file after the current time
+        root, extension = os.path.splitext(self.baseFilename)
+        timestamp = time.strftime('%Y%m%d-%H%M%S')
+        path = '{}.{}{}'.format(root, timestamp, extension)
+        counter = 1
+        while os.path.exists(path) or os.path.exists(path + '.gz'):
+            path = '{}.{}-{}{}'.format(root, timestamp, counter, extension)
+            counter += 1
+        try:
+            os.replace(self.baseFilename, path)
+        finally:
+            self.stream = self._open()
+        self._opened = time.time()
+        self._retry = None
+
+        # Compress and clean up in the background
+        worker = threading.Thread(target=self._archive, args=(path, self._worker),
+                                  name='LogArchiver', daemon=True)
+        self._worker = worker
+        worker.start()
+
+    def _archive(self, path, previous):
+        # Note: Runs one after another, so files are not compressed twice
+        if previous is not None:
+            previous.join()
+        try:
+            if self.compress:
+                with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(path)
+            self._remove_old()
+        except OSError:
+            # Note: Logging from here would write into the file of this handler
+            self.handleError(logging.makeLogRecord({
+                'msg': 'Could not archive log file "{}"'.format(path),
+            }))
+
+    def _remove_old(self):
+        root, extension = os.path.splitext(self.baseFilename)
+        pattern = '{}.*{}'.format(glob.escape(root), extension)
+        paths = sorted(glob.glob(pattern) + glob.glob(pattern + '.gz'),
+                       key=os.path.getmtime, reverse=True)
+        now = time.time()
+        for index, path in enumerate(paths):
+            expired = self.retention is not None \
+                and now - os.path.getmtime(path) > self.retention
+            if expired or (self.backup_count is not None and index >= self.backup_count):
+                os.remove(path)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Put log records into a bounded queue without blocking. Records
+    will be dropped and counted if the queue is full.
+
+    Messages whose arguments are immutable will be formatted by the
+    writer thread. Other messages are formatted right away, so they
+    show the state of their arguments at the time of the call and
+    their arguments are not accessed from another thread. The
+    unformatted message and the arguments are kept in the
+    `unformatted` attribute of the record, with mutable arguments
+    replaced by their representation.
+
+    Arguments:
+        - `queue`: A bounded :class:`queue.Queue` instance.
+    """
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record):
+        if isinstance(record.msg, Message):
+            fmt, args = record.msg.fmt, record.msg.args
+        else:
+            fmt, args = record.msg, record.args
+        if isinstance(fmt, str) and _is_immutable(args or ()):
+            # Note: Formatting is deferred to the writer thread
+            return record
+        if not isinstance(args, tuple):
+            args = () if args is None else (args,)
+        # Note: Only mutable arguments need to be snapshotted
+        record.unformatted = (str(fmt), tuple(
+            arg if _is_immutable(arg) else repr(arg) for arg in args))
+        record.msg, record.args = record.getMessage(), None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _is_immutable(value):
+    if isinstance(value, tuple):
+        return all(_is_immutable(item) for item in value)
+    return value is None or isinstance(value, (str, int, float, bytes))
+
+
+class LogWriter(threading.Thread):
+    """
+    Take log records from a queue and pass them in batches to
+    handlers in a background thread.
+
+    Arguments:
+        - `queue`: The :class:`queue.Queue` instance records are taken
+          from.
+        - `handlers`: The handlers records will be passed to. Handlers
+          with a `handle_batch` method will receive a whole batch.
+        - `queue_handler`: The :class:`DroppingQueueHandler` whose
+          dropped records will be reported.
+        - `batch_size`: The maximum amount of records per batch.
+    """
+    def __init__(self, queue_, handlers, queue_handler=None, batch_size=None):
+        super().__init__(name='LogWriter', daemon=True)
+        self._queue = queue_
+        self.handlers = handlers
+        self._queue_handler = queue_handler
+        self._reported = 0
+        self.batch_size = log_batch_size if batch_size is None else batch_size
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            # Wait for a record and take all records that are available
+            records = [self._queue.get()]
+            while len(records) < self.batch_size:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Note: `None` is used to stop the writer
+            if None in records:
+                stopping = True
+                records = [record for record in records if record is not None]
+            # Note: Errors must not stop the writer, otherwise all further records
+            #       would be dropped
+            try:
+                self._report_dropped(records)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+            self._write(records)
+
+    def stop(self, timeout=1.0):
+        """
+        Write the remaining log records and stop the writer.
+
+        Arguments:
+            - `timeout`: The maximum amount of seconds to wait.
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.join(timeout=timeout)
+
+    def _report_dropped(self, records):
+        if self._queue_handler is None:
+            return
+        dropped = self._queue_handler.dropped
+        if dropped > self._reported:
+            message = '{} log record(s) dropped because the log queue was full'
+            records.append(logging.getLogger('gta').makeRecord(
+                'gta', logging.WARNING, __file__, 0,
+                Message(message, (dropped - self._reported,)), (), None))
+            self._reported = dropped
+
+    def _write(self, records):
+        # Note: A failing handler must not keep records from the other handlers
+        for handler in self.handlers:
+            if hasattr(handler, 'handle_batch'):
+                try:
+                    handler.handle_batch(records)
+                except Exception:
+                    handler.handleError(logging.makeLogRecord({
+                        'msg': 'Could not write {} log record(s)'.format(len(records)),
+                    }))
+            else:
+                for record in records:
+                    if record.levelno >= handler.level:
+                        try:
+                            handler.handle(record)
+                        except Exception:
+                            handler.handleError(record)
+
+
+class ContextFilter(logging.Filter):
+    """
+    Add the script that is running, the current tick and a monotonic
+    timestamp to log records. Needs to be added to the handler that is
+    attached to the loggers, so the context is taken from the thread
+    that created the record.
+
+    Adds the following attributes to each record:
+        - `script`: The name of the script whose task created the
+          record or ``None``.
+        - `tick`: The amount of ticks the game has processed.
+        - `monotonic`: The value of :func:`time.monotonic`.
+    """
+    def filter(self, record):
+        # Note: Another handler may have added the context already
+        if not hasattr(record, 'tick'):
+            record.script = _current_script()
+            record.tick = getattr(gta, '_tick_count', None)
+            record.monotonic = time.monotonic()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Format log records as JSON objects on a single line, so log files
+    can be analysed without parsing the text format. The message is
+    stored formatted and unformatted along with its raw arguments.
+    Arguments that can not be serialised are stored as their
+    representation.
+
+    Use :class:`ContextFilter` to add the script, tick and monotonic
+    timestamp to the records.
+    """
+    def format(self, record):
+        if hasattr(record, 'unformatted'):
+            fmt, args = record.unformatted
+        elif isinstance(record.msg, Message):
+            fmt, args = record.msg.fmt, record.msg.args
+        else:
+            fmt, args = record.msg, record.args
+        entry = collections.OrderedDict((
+            ('time', record.created),
+            ('monotonic', getattr(record, 'monotonic', None)),
+            ('tick', getattr(record, 'tick', None)),
+            ('script', getattr(record, 'script', None)),
+            ('logger', record.name),
+            ('level', record.levelname),
+            ('fmt', fmt if isinstance(fmt, str) else str(fmt)),
+            ('args', args),
+            ('message', record.getMessage()),
+        ))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=repr, separators=(',', ':'))
+
+
+def _current_script():
+    # Note: Only the thread of the event loop runs script tasks
+    loop = getattr(gta, '_loop', None)
+    if loop is None or threading.current_thread() is not getattr(gta, '_thread', None):
+        return None
+    task = asyncio.Task.current_task(loop=loop)
+    return getattr(task, 'script', None)
+
+
 def get_directory():
     return os.path.abspath(os.path.join(os.getcwd(), 'python'))
 
 
-def setup_logging(console):
+def setup_logging(console, queued=True, max_bytes=None, max_age=None, backup_count=None,
+                  retention=None, compress=True, structured=None):
     """
     Setup logging formatter, handlers, etc. for the `gta` and `pip`
     logger.
 
     Arguments:
         - `console`: Use console logging instead of file logging.
+        - `queued`: Write log records in a background thread, so
+          logging does not block the event loop. Records will be
+          dropped if more than :data:`log_queue_size` records are
+          waiting to be written.
+        - `max_bytes`: Rotate the log file once it exceeds this amount
+          of bytes. Defaults to :data:`log_max_bytes`.
+        - `max_age`: Rotate the log file once it is older than this
+          amount of seconds. Defaults to :data:`log_max_age`.
+        - `backup_count`: The maximum amount of rotated log files.
+          Defaults to :data:`log_backup_count`.
+        - `retention`: Remove rotated log files older than this
+          amount of seconds. Defaults to :data:`log_retention`.
+        - `compress`: Compress rotated log files using gzip.
+        - `structured`: Write a JSON lines log file as well. Defaults
+          to whether the environment variable
+          :data:`structured_log_variable` is set.
     """
+    global _log_handlers, _log_writer
+
+    # Remove handlers of a previous setup
+    stop_logging()
+
     # Setup formatter and handler
     formatter = logging.Formatter(
         fmt='{asctime} {name:<22} {levelname:<18} {message}',
@@ -88,12 +562,39 @@ def setup_logging(console):
     )
 
     # Output in file or using the console
+    rotation = {
+        'max_bytes': log_max_bytes if max_bytes is None else max_bytes,
+        'max_age': log_max_age if max_age is None else max_age,
+        'backup_count': log_backup_count if backup_count is None else backup_count,
+        'retention': log_retention if retention is None else retention,
+        'compress': compress,
+    }
     if console:
-        handler = logging.StreamHandler()
-        handler.setFormatter(formatter)
+        handler = BatchStreamHandler()
     else:
-        handler = logging.FileHandler('scripthookvpy3k.log')
-        handler.setFormatter(formatter)
+        handler = RotatingBatchFileHandler('scripthookvpy3k.log', **rotation)
+    handler.setFormatter(formatter)
+    handlers = [handler]
+
+    # Structured output for offline analysis
+    if structured is None:
+        structured = bool(os.environ.get(structured_log_variable))
+    if structured:
+        handler = RotatingBatchFileHandler('scripthookvpy3k.jsonl', **rotation)
+        handler.setFormatter(JsonLinesFormatter())
+        handlers.append(handler)
+
+    # Pass records to a background writer
+    if queued:
+        records = queue.Queue(maxsize=log_queue_size)
+        queue_handler = DroppingQueueHandler(records)
+        _log_writer = LogWriter(records, handlers, queue_handler=queue_handler)
+        _log_writer.start()
+        handlers = [queue_handler]
+    if structured:
+        for handler in handlers:
+            handler.addFilter(ContextFilter())
+    _log_handlers = handlers
 
     # Redirect warnings to the logger
     logging.captureWarnings(True)
@@ -108,7 +609,31 @@ def setup_logging(console):
     for name, level in loggers:
         logger = logging.getLogger(name)
         logger.setLevel(level)
-        logger.addHandler(handler)
+        for handler in _log_handlers:
+            logger.addHandler(handler)
+    update_levels()
+
+
+def stop_logging(timeout=1.0):
+    """
+    Write pending log records, stop the background writer and remove
+    the handlers that have been added by :func:`setup_logging`.
+
+    Arguments:
+        - `timeout`: The maximum amount of seconds to wait for pending
+          records to be written.
+    """
+    global _log_handlers, _log_writer
+    for handler in _log_handlers:
+        for name in ('gta', 'py.warnings', 'asyncio', 'pip'):
+            logging.getLogger(name).removeHandler(handler)
+        handler.close()
+    _log_handlers = []
+    if _log_writer is not None:
+        _log_writer.stop(timeout=timeout)
+        for handler in _log_writer.handlers:
+            handler.close()
+        _log_writer = None
 
 
 def get_logger(name='gta'):
@@ -119,12 +644,31 @@ def get_logger(name='gta'):
     Arguments:
         - `name`: The name of the logger.
 
-    Return the wrapped :class:`logging.logger` instance.
+    Return the wrapped :class:`logging.logger` instance. The same
+    instance will be returned for the same name.
     """
-    return CurlyBracketFormattingAdapter(logging.getLogger(name))
+    adapter = _adapters.get(name)
+    if adapter is None:
+        adapter = _adapters[name] = CurlyBracketFormattingAdapter(logging.getLogger(name))
+    return adapter
+
+
+def update_levels():
+    """
+    Update the debug flags of all adapters returned by
+    :func:`get_logger`. Needs to be called after logger levels have
+    been changed.
+    """
+    for adapter in list(_adapters.values()):
+        adapter.update_levels()
 
 
 dependencies_blacklist = {'aiohttp', 'numpy', 'scipy'}
+# Dependencies will be installed from this directory instead of the package index if
+# it exists (relative to the scripts main directory)
+dependencies_wheelhouse = 'wheelhouse'
+# Contains a hash of the dependencies that were satisfied on the last startup
+dependencies_lock = 'dependencies.lock'
 
 
 def install_dependency(dependency):
@@ -134,37 +678,176 @@ def install_dependency(dependency):
     Arguments:
         - `dependency`: A dependency as a `requirement specifier
           <https://pip.pypa.io/en/latest/reference/pip_install.html#requirement-specifiers>`_.
-        - `use_script_path`: Install the dependency into the specified
-          directory instead of the scripts main directory.
+    """
+    failed = install_dependencies((dependency,), lock=False)
+    if dependency in failed:
+        raise failed[dependency]
+
+
+def install_dependencies(dependencies, lock=True):
+    """
+    Install all missing dependencies with a single :class:`pip`
+    invocation. If that fails, the missing dependencies will be
+    installed one by one, so only the scripts whose dependencies
+    failed are affected.
+
+    Specifiers of the same project will be merged and checked against
+    a single snapshot of the installed distributions. If the
+    dependencies have not changed since they were satisfied the last
+    time, the check will be skipped entirely.
+
+    Arguments:
+        - `dependencies`: An iterable of `requirement specifiers
+          <https://pip.pypa.io/en/latest/reference/pip_install.html#requirement-specifiers>`_.
+        - `lock`: Use and update the lock file.
+
+    Return an ordered dict that maps the dependencies that could not be
+    installed to a :class:`ScriptError` instance.
     """
     logger = get_logger()
 
     # Get path
     path = os.path.abspath(get_directory())
+    dependencies = sorted(set(dependencies))
+
+    # Skip the check if nothing changed since the last startup
+    digest = _dependencies_digest(dependencies)
+    lock_path = os.path.join(path, dependencies_lock)
+    if lock and _read_lock(lock_path) == digest:
+        logger.debug('Dependencies unchanged, skipping check')
+        return collections.OrderedDict()
+
+    # Merge specifiers and find requirements that are not satisfied
+    failed = collections.OrderedDict()
+    requirements = _merge_requirements(dependencies, failed)
+    working_set = pkg_resources.WorkingSet()
+    missing = []
+    for requirement, origins in requirements.values():
+        try:
+            working_set.resolve([requirement])
+        except pkg_resources.ResolutionError:
+            # Check if dependency is blacklisted
+            if requirement.key in dependencies_blacklist:
+                for dependency in origins:
+                    failed[dependency] = DependencyBlacklistedError(dependency)
+            else:
+                missing.append((requirement, origins))
+        else:
+            logger.debug('Dependency "{}" already satisfied', requirement)
 
-    try:
-        # Check if dependency is satisfied
-        pkg_resources.require(dependency)
-    except pkg_resources.ResolutionError:
-        # Check if dependency is blacklisted
-        for requirement in pkg_resources.parse_requirements(dependency):
-            if requirement.project_name in dependencies_blacklist:
-                raise DependencyBlacklistedError(dependency)
+    if len(missing) > 0:
+        try:
+            _run_pip(path, [requirement for requirement, origins in missing])
+            missing = []
+        except pip.exceptions.PipError:
+            logger.exception('Installing dependencies failed')
+
+    # Note: A single requirement that can not be installed must not affect the
+    #       other scripts, so retry the requirements one by one
+    if len(missing) > 1:
+        logger.info('Installing dependencies one by one')
+        retry, missing = missing, []
+        for requirement, origins in retry:
+            try:
+                _run_pip(path, [requirement])
+            except pip.exceptions.PipError:
+                logger.exception('Installing dependency "{}" failed', requirement)
+                missing.append((requirement, origins))
+    for requirement, origins in missing:
+        for dependency in origins:
+            failed[dependency] = InstallDependencyError(dependency)
+
+    # Remember satisfied dependencies
+    if lock and len(failed) == 0:
+        _write_lock(lock_path, digest)
+    return failed
+
+
+def _run_pip(path, requirements):
+    """
+    Install requirements into a path with a single :class:`pip`
+    invocation.
 
+    Arguments:
+        - `path`: The directory the requirements will be installed
+          into.
+        - `requirements`: A list of :class:`pkg_resources.Requirement`
+          instances.
+
+    Raise :class:`pip.exceptions.PipError` if installing failed.
+    """
+    logger = get_logger()
+    specifiers = [str(requirement) for requirement in requirements]
+    message = 'Installing dependencies "{}" into path "{}"'
+    logger.debug(message, '", "'.join(specifiers), os.path.relpath(path))
+    arguments = ['--disable-pip-version-check', '--upgrade', '--target', path]
+    wheelhouse = os.path.join(path, dependencies_wheelhouse)
+    if os.path.isdir(wheelhouse):
+        logger.debug('Using wheelhouse "{}"', os.path.relpath(wheelhouse))
+        arguments += ['--no-index', '--find-links', wheelhouse]
+    command = pip.commands.InstallCommand(isolated=True)
+    # Note: We can't run 'main' because it overrides our logging settings
+    options, args = command.parse_args(arguments + specifiers)
+    command.run(options, args)
+
+
+def _merge_requirements(dependencies, failed):
+    """
+    Parse dependencies and merge the specifiers and extras of the same
+    project. Dependencies with different environment markers will not
+    be merged.
+
+    Arguments:
+        - `dependencies`: An iterable of requirement specifiers.
+        - `failed`: A dict invalid dependencies will be added to.
+
+    Return an ordered dict that maps project keys and markers to a
+    tuple of the merged :class:`pkg_resources.Requirement` and a list of the
+    dependencies it has been merged from.
+    """
+    requirements = collections.OrderedDict()
+    for dependency in dependencies:
         try:
-            # Install dependency
-            message = 'Installing dependency "{}" into path "{}"'
-            logger.debug(message, dependency, os.path.relpath(path))
-            command = pip.commands.InstallCommand(isolated=True)
-            # Note: We can't run 'main' because it overrides our logging settings
-            options, args = command.parse_args([
-                '--disable-pip-version-check',
-                '--upgrade',
-                '--target', path,
-                dependency
-            ])
-            command.run(options, args)
-        except pip.exceptions.PipError as exc:
-            raise InstallDependencyError(dependency) from exc
-    else:
-        logger.debug('Dependency "{}" already satisfied', dependency)
+            requirement = pkg_resources.Requirement.parse(dependency)
+        except ValueError:
+            failed[dependency] = InstallDependencyError(dependency)
+            continue
+
+        # Note: Older versions of pkg_resources do not parse markers
+        marker = getattr(requirement, 'marker', None)
+        key = (requirement.key, str(marker) if marker is not None else None)
+        previous, origins = requirements.get(key, (None, []))
+        if previous is not None:
+            extras = sorted(set(previous.extras) | set(requirement.extras))
+            specifier = previous.specifier & requirement.specifier
+            requirement = pkg_resources.Requirement.parse('{}{}{}{}'.format(
+                requirement.project_name,
+                '[{}]'.format(','.join(extras)) if len(extras) > 0 else '',
+                specifier,
+                '; {}'.format(marker) if marker is not None else ''))
+        requirements[key] = (requirement, origins + [dependency])
+    return requirements
+
+
+def _dependencies_digest(dependencies):
+    # Note: The interpreter version is included because installed packages
+    #       may not be compatible with another version
+    content = '\n'.join([sys.version] + list(dependencies))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _read_lock(path):
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def _write_lock(path, digest):
+    logger = get_logger()
+    try:
+        with open(path, 'w') as file:
+            file.write(digest + '\n')
+    except OSError as exc:
+        logger.warning('Could not write dependencies lock file: {}', exc)
@@ -14,6 +14,13 @@ __version__ = '0.0.1'
 # A list of dependencies in the requirement specifiers format
 # See: https://pip.pypa.io/en/latest/reference/pip_install.html#requirement-specifiers
 __dependencies__ = ('aiohttp>=0.15.3',)
+# The priority class of the script: Use one of 'realtime', 'high', 'normal', 'low'
+# Scripts with a higher priority will be run first on each tick
+__priority__ = 'normal'
+# Restart the script automatically after it raised an exception
+__restart__ = False
+# Log steps of the script that take longer than this amount of seconds
+__slow_step_threshold__ = 0.05
 
 
 @asyncio.coroutine
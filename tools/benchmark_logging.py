@@ -0,0 +1,47 @@
+"""
+Measure the cost of log calls that are filtered by the level, e.g. a
+``logger.debug('{}', x)`` call while debug messages are disabled.
+
+Run this from the 'python' directory::
+
+    python ../tools/benchmark_logging.py
+"""
+import logging
+import sys
+import timeit
+import unittest.mock
+
+# Create fake native module
+sys.modules['_gta_native'] = unittest.mock.MagicMock()
+sys.path.insert(0, '.')
+from gta import utils
+
+number = 1000000
+
+
+def main():
+    # Disable debug messages
+    logger = logging.getLogger('gta.benchmark')
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.NullHandler())
+    adapter = utils.get_logger('gta.benchmark')
+    x = 42
+
+    cases = (
+        ('logging.Logger.debug', lambda: logger.debug('%s', x)),
+        ('Uncached adapter', lambda: utils.CurlyBracketFormattingAdapter(
+            logger).debug('{}', x)),
+        ('get_logger() and debug', lambda: utils.get_logger('gta.benchmark').debug('{}', x)),
+        ('Cached adapter debug', lambda: adapter.debug('{}', x)),
+        ('Checking debug_enabled', lambda: adapter.debug_enabled and adapter.debug('{}', x)),
+    )
+
+    # Subtract the cost of calling an empty function
+    baseline = min(timeit.repeat(lambda: None, number=number, repeat=3))
+    print('{:<28} {:>12}'.format('Case', 'ns per call'))
+    for name, case in cases:
+        seconds = min(timeit.repeat(case, number=number, repeat=3)) - baseline
+        print('{:<28} {:>12.1f}'.format(name, seconds / number * 1e9))
+
+if __name__ == '__main__':
+    main()
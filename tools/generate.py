@@ -1,8 +1,25 @@
 """
 Parse natives.h, generate wrapper with SWIG and apply namespaces in
 the generated wrapper.
+
+The wrapper can either be written as a single module containing a
+class for each namespace (default) or as a package containing a
+submodule for each namespace that is loaded lazily on first access::
+
+    python generate.py --layout package
+
+By default, each native function is wrapped by a Python function that
+forwards to the SWIG extension. The direct binding mode assigns the
+functions of the extension to the namespaces instead, which saves a
+Python call on every native call. The parameter names are kept in a
+generated signature table::
+
+    python generate.py --binding direct
 """
+import argparse
+import collections
 import os
+import shutil
 import subprocess
 import io
 
@@ -14,14 +31,101 @@ natives_h = os.path.join(path, 'sdk', 'inc', 'natives.h')
 natives_i = os.path.join(path, 'cpp', 'src', 'natives.i')
 gta_native_py_in = os.path.join(path, 'cpp', 'src', 'gta_native.py')
 gta_native_py_out = os.path.join(path, 'python', 'gta_native.py')
+gta_native_package_out = os.path.join(path, 'python', 'gta_native')
 
 swig_path = os.path.join(path, 'swig')
 swig_version = ['swig', '-version']
 swig_generate = ['swig', '-python', '-c++', natives_i]
 swig_required_version = '3.0.5'
 
+indent = ' ' * 4
+
+lazy_loader = '''
+
+import importlib as _importlib
+import sys as _sys
+import types as _types
+
+# Functions that will be called with the name and the module of each namespace
+# once it has been imported, e.g. to wrap its functions
+__import_hooks__ = []
+
+
+def _namespace_imported(qualified_name):
+    module = _sys.modules[qualified_name]
+    for hook in list(__import_hooks__):
+        hook(qualified_name.rpartition('.')[2], module)
+
+
+class _LazyModule(_types.ModuleType):
+    """
+    Import namespace submodules on first attribute access.
+    """
+    def __getattr__(self, name):
+        if name in __namespaces__:
+            return _importlib.import_module('.' + name, __name__)
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(__namespaces__))
+
+_sys.modules[__name__].__class__ = _LazyModule
+
+
+'''
+
+signature_helper = '''
+
+def signature(namespace, name):
+    """
+    Return the :class:`inspect.Signature` of a native function.
+
+    Arguments:
+        - `namespace`: The namespace the native function belongs to.
+        - `name`: The name of the native function.
+    """
+    import inspect
+    try:
+        names = getattr(namespace, '__signatures__')[name]
+    except (AttributeError, KeyError):
+        return inspect.signature(getattr(namespace, name))
+    parameters = []
+    for name_ in names:
+        if name_.startswith('*'):
+            kind = inspect.Parameter.VAR_POSITIONAL
+        else:
+            kind = inspect.Parameter.POSITIONAL_OR_KEYWORD
+        parameters.append(inspect.Parameter(name_.lstrip('*'), kind))
+    return inspect.Signature(parameters)
+
+
+'''
+
+namespace_module_head = '''"""
+Native functions of the `{}` namespace.
+
+This file was automatically generated by tools/generate.py. Do not make
+changes to this file, regenerate it instead.
+"""
+from gta_native import _gta_native, _namespace_imported
+
+
+'''
+
+namespace_module_tail = '''
+
+_namespace_imported(__name__)
+'''
+
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--layout', choices=('module', 'package'), default='module',
+                        help='Write a single module or a lazily loaded package')
+    parser.add_argument('--binding', choices=('wrapper', 'direct'), default='wrapper',
+                        help='Wrap native functions or bind them directly')
+    arguments = parser.parse_args()
+
     # Change to SWIG path
     os.chdir(swig_path)
 
@@ -59,8 +163,7 @@ def main():
             if line.startswith('static'):
                 *init, last = line.split(' ', maxsplit=2)
                 name, *tail = last.split('(', maxsplit=1)
-                functions.setdefault(namespace, set())
-                functions[namespace].add(name)
+                functions[name] = namespace
 
     # Generate wrapper
     print('Generating wrapper')
@@ -69,14 +172,48 @@ def main():
     except subprocess.CalledProcessError as exc:
         fail(exc, 3)
 
-    # Rewrite Python wrapper
-    last_namespace = None
+    # Parse generated Python wrapper
+    print('Parsing generated Python wrapper')
+    init, namespaces, tail = parse(functions)
+    version = "__version__ = '{}'\n".format(date.strip("'"))
+
+    # Write new Python wrapper
+    print('Writing new Python wrapper ({}, {})'.format(arguments.layout, arguments.binding))
+    direct = arguments.binding == 'direct'
+    if arguments.layout == 'package':
+        write_package(init, version, namespaces, tail, direct=direct)
+    else:
+        write_module(init, version, namespaces, tail, direct=direct)
+
+    # Remove originally generated Python wrapper
+    print('Removing originally generated Python wrapper')
+    os.remove(gta_native_py_in)
+
+    # Done
+    print('Done')
+    sys.exit(0)
+
+
+def parse(functions):
+    """
+    Split the SWIG generated Python wrapper into the lines before the
+    first native function, the native functions of each namespace and
+    the remaining lines.
+
+    Arguments:
+        - `functions`: A dict that maps native function names to their
+          namespace.
+
+    Return a tuple containing the head lines, an ordered dict that
+    maps namespaces to a list of ``(name, parameters, return line)``
+    tuples and the tail lines.
+    """
     function_found = False
     skip = 0
-    indent = ' ' * 4
     init = []
-    middle = ["__version__ = '{}'\n\n\n".format(date.strip("'"))]
+    namespaces = collections.OrderedDict()
     tail = []
+    pending = None
 
     def add_normal(_line):
         if function_found:
@@ -84,67 +221,145 @@ def main():
         else:
             init.append(_line)
 
-    def add_class_assignment():
-        if last_namespace is not None:
-            middle.append('{} = _{}\n\n\n'.format(
-                last_namespace, last_namespace.capitalize()))
-
-    def maybe_add_method(_line):
-        nonlocal last_namespace, function_found
-        for _namespace, names in functions.items():
-            for _name in names:
-                if _line.startswith('def {}('.format(_name)):
-                    function_found = True
-                    if _namespace != last_namespace:
-                        # Insert class assignment at the end of a namespace
-                        add_class_assignment()
-
-                        # Insert class declaration at the start of a namespace
-                        middle.append('class _{}(_object):\n'.format(_namespace.capitalize()))
-                        last_namespace = _namespace
-
-                    # Insert staticmethod and function definition
-                    *_, _last = _line.split('(', maxsplit=1)
-                    middle.append(indent + '@staticmethod\n')
-                    middle.append(indent + 'def {}({}'.format(
-                        _name if _name.startswith('_') else _name.lower(),
-                        _last
-                    ))
-                    return 3
-        add_normal(_line)
-        return 0
-
-    # Parse generated Python wrapper
-    print('Parsing generated Python wrapper')
     with open(gta_native_py_in) as natives_in:
         for line in natives_in:
             if skip > 0:
-                # Return statement
                 if skip == 3:
-                    middle.append('{}{}\n'.format(indent, line))
+                    # Return statement
+                    name, parameters = pending
+                    namespaces[functions[name]].append((name, parameters, line.strip()))
                 elif skip == 1 and len(line.strip()) > 0:
                     add_normal(line)
                 skip -= 1
             elif line.startswith('def '):
                 # Function
-                skip = maybe_add_method(line)
+                name, parameters = line[len('def '):].split('(', maxsplit=1)
+                if name in functions:
+                    function_found = True
+                    namespaces.setdefault(functions[name], [])
+                    pending = (name, '(' + parameters.rstrip())
+                    skip = 3
+                else:
+                    add_normal(line)
             else:
                 # Something else
                 add_normal(line)
-        add_class_assignment()
 
-    # Write new Python wrapper
-    print('Writing new Python wrapper')
+    return init, namespaces, tail
+
+
+def python_name(name):
+    return name if name.startswith('_') else name.lower()
+
+
+def extension_function(statement):
+    """
+    Return the extension function a return statement calls, e.g.
+    ``_gta_native.PLAYER_ID``.
+    """
+    call, *_ = statement[len('return '):].split('(', maxsplit=1)
+    return call
+
+
+def parameter_names(parameters):
+    """
+    Return a tuple of parameter names from a parameter list, e.g.
+    ``('player', 'x')`` for ``(player, x):``.
+    """
+    names = parameters.strip().lstrip('(').rstrip(':').rstrip(')')
+    return tuple(name.strip() for name in names.split(',') if len(name.strip()) > 0)
+
+
+def signature_table(entries, prefix=''):
+    """
+    Return the lines of a dict that maps the function names of a
+    namespace to their parameter names.
+    """
+    lines = [prefix + '__signatures__ = {\n']
+    for name, parameters, _ in entries:
+        lines.append('{}{}{!r}: {!r},\n'.format(
+            prefix, indent, python_name(name), parameter_names(parameters)))
+    lines.append(prefix + '}\n')
+    return lines
+
+
+def write_module(init, version, namespaces, tail, direct=False):
+    """
+    Write a single module containing a class for each namespace.
+
+    Arguments:
+        - `direct`: Bind the extension functions directly.
+    """
+    middle = [version, '\n\n']
+    if direct:
+        middle.append(signature_helper.lstrip('\n'))
+    for namespace, entries in namespaces.items():
+        # Class declaration
+        middle.append('class _{}(_object):\n'.format(namespace.capitalize()))
+        if direct:
+            # Insert signature table and extension function for each function
+            middle.extend(signature_table(entries, prefix=indent))
+            middle.append('\n')
+            for name, parameters, statement in entries:
+                middle.append('{}{} = {}\n'.format(
+                    indent, python_name(name), extension_function(statement)))
+            middle.append('\n')
+        else:
+            # Insert staticmethod and function definition for each function
+            for name, parameters, statement in entries:
+                middle.append(indent + '@staticmethod\n')
+                middle.append(indent + 'def {}{}\n'.format(python_name(name), parameters))
+                middle.append('{}{}\n\n'.format(indent * 2, statement))
+        # Class assignment
+        middle.append('{} = _{}\n\n\n'.format(namespace, namespace.capitalize()))
+
+    # Remove a previously generated package
+    if os.path.isdir(gta_native_package_out):
+        shutil.rmtree(gta_native_package_out)
     with open(gta_native_py_out, 'w') as natives_out:
         natives_out.writelines(init + middle + tail)
 
-    # Remove originally generated Python wrapper
-    print('Removing originally generated Python wrapper')
-    os.remove(gta_native_py_in)
 
-    # Done
-    print('Done')
-    sys.exit(0)
+def write_package(init, version, namespaces, tail, direct=False):
+    """
+    Write a package containing a submodule for each namespace. The
+    submodules will be imported on first access.
+
+    Arguments:
+        - `direct`: Bind the extension functions directly.
+    """
+    # Remove a previously generated module or package
+    if os.path.exists(gta_native_py_out):
+        os.remove(gta_native_py_out)
+    if os.path.isdir(gta_native_package_out):
+        shutil.rmtree(gta_native_package_out)
+    os.mkdir(gta_native_package_out)
+
+    # Write package with shared SWIG code, the lazy loader and the tail
+    middle = [version, '__namespaces__ = {!r}\n'.format(tuple(namespaces)), lazy_loader]
+    if direct:
+        middle.append(signature_helper.lstrip('\n'))
+    package_path = os.path.join(gta_native_package_out, '__init__.py')
+    with open(package_path, 'w') as package_out:
+        package_out.writelines(init + middle + tail)
+
+    # Write a submodule for each namespace
+    for namespace, entries in namespaces.items():
+        lines = [namespace_module_head.format(namespace)]
+        if direct:
+            lines.extend(signature_table(entries))
+            lines.append('\n')
+            for name, parameters, statement in entries:
+                lines.append('{} = {}\n'.format(python_name(name), extension_function(statement)))
+        else:
+            for name, parameters, statement in entries:
+                lines.append('def {}{}\n'.format(python_name(name), parameters))
+                lines.append('{}{}\n\n\n'.format(indent, statement))
+            lines[-1] = lines[-1].rstrip('\n') + '\n'
+        lines.append(namespace_module_tail)
+        module_path = os.path.join(gta_native_package_out, namespace + '.py')
+        with open(module_path, 'w') as module_out:
+            module_out.writelines(lines)
 
 
 def fail(message, status):
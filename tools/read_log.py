@@ -0,0 +1,141 @@
+"""
+Filter and aggregate structured log files written by
+:class:`gta.utils.JsonLinesFormatter`. Rotated files compressed with
+gzip can be passed directly.
+
+Print all warnings and errors of a script::
+
+    python read_log.py scripthookvpy3k.jsonl --script wanted --level WARNING
+
+Count the records per script and message format::
+
+    python read_log.py scripthookvpy3k.*.jsonl.gz --count script fmt
+
+Lines that can not match a filter are skipped before being decoded,
+so filtering by script or logger is fast even for large files.
+"""
+import argparse
+import collections
+import gzip
+import json
+import logging
+import sys
+
+
+def open_log(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    else:
+        return open(path, encoding='utf-8', errors='replace')
+
+
+def read_entries(paths, script=None, logger=None, level=None, ticks=None, text=None):
+    # Note: The formatter writes compact JSON, so a key and its value can be
+    #       searched in the raw line before decoding it
+    needles = []
+    if script is not None:
+        needles.append('"script":' + json.dumps(script))
+    if logger is not None:
+        needles.append('"logger":' + json.dumps(logger))
+    if text is not None and json.dumps(text)[1:-1] == text:
+        needles.append(text)
+    minimum = parse_level(level) if level is not None else None
+
+    for path in paths:
+        with open_log(path) as file:
+            for line in file:
+                if any(needle not in line for needle in needles):
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Note: The last line may be incomplete
+                    continue
+                # Note: The raw line may contain the needles in the message arguments
+                if script is not None and entry['script'] != script:
+                    continue
+                if logger is not None and entry['logger'] != logger:
+                    continue
+                if minimum is not None and _level_number(entry['level']) < minimum:
+                    continue
+                if ticks is not None:
+                    tick = entry.get('tick')
+                    if tick is None or not ticks[0] <= tick <= ticks[1]:
+                        continue
+                if text is not None and text not in entry['message']:
+                    continue
+                yield entry
+
+
+def print_entries(entries):
+    for entry in entries:
+        print('{:>10} {:<22} {:<8} {:<16} {}'.format(
+            entry['tick'] if entry['tick'] is not None else '-', entry['logger'],
+            entry['level'], entry['script'] or '-', entry['message']))
+        if 'exception' in entry:
+            print(entry['exception'])
+
+
+def print_counts(entries, keys):
+    counts = collections.Counter(
+        tuple(str(entry.get(key)) for key in keys) for entry in entries)
+    print('{:>10}  {}'.format('Count', '  '.join(keys)))
+    for values, count in counts.most_common():
+        print('{:>10}  {}'.format(count, '  '.join(values)))
+
+
+def _level_number(name):
+    number = logging.getLevelName(name)
+    return number if isinstance(number, int) else 0
+
+
+def parse_level(value):
+    """
+    Return the number of a level name.
+
+    Raise :class:`ValueError` if the level is unknown.
+    """
+    number = logging.getLevelName(value.upper())
+    if not isinstance(number, int):
+        raise ValueError('Unknown level "{}"'.format(value))
+    return number
+
+
+def parse_ticks(value):
+    first, _, last = value.partition(':')
+    return (int(first) if first else 0,
+            int(last) if last else sys.maxsize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Filter and aggregate structured logs.')
+    parser.add_argument('paths', nargs='+', metavar='path',
+                        help='JSON lines log files, optionally compressed with gzip')
+    parser.add_argument('--script', help='Only records of this script')
+    parser.add_argument('--logger', help='Only records of this logger')
+    parser.add_argument('--level', help='Only records of this level or above')
+    parser.add_argument('--ticks', type=parse_ticks, metavar='FIRST:LAST',
+                        help='Only records within this range of ticks')
+    parser.add_argument('--text', help='Only records whose message contains this text')
+    parser.add_argument('--count', nargs='+', metavar='KEY',
+                        choices=('script', 'logger', 'level', 'fmt', 'tick'),
+                        help='Count records grouped by these keys instead of printing them')
+    args = parser.parse_args()
+    if args.level is not None:
+        try:
+            parse_level(args.level)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    entries = read_entries(args.paths, script=args.script, logger=args.logger,
+                           level=args.level, ticks=args.ticks, text=args.text)
+    try:
+        if args.count:
+            print_counts(entries, args.count)
+        else:
+            print_entries(entries)
+    except BrokenPipeError:
+        pass
+
+if __name__ == '__main__':
+    main()